@@ -2,8 +2,12 @@
 Name of the author(s):
 - Louis Navarre <louis.navarre@uclouvain.be>
 """
+import os
+import struct
 import time
 import sys
+from collections import deque
+from math import comb
 from search import *
 
 
@@ -12,19 +16,18 @@ from search import *
 #################
 class Rubik2D(Problem):
 
-    def __init__(self, initial, goal=None):
+    def __init__(self, initial, goal=None, prune=False):
+        if goal is None:
+            goal = State(initial.shape, initial.answer, initial.answer, "Goal")
         super().__init__(initial, goal)
-        self.acts = []
-        m, n = self.initial.shape
-        for i in range(m):
-            for j in range(m-1):
-                self.acts.append(f"r:{i}:{j+1}")
-        for i in range(n):
-            for j in range(n-1):
-                self.acts.append(f"c:{i}:{j+1}")
+        self.acts = build_actions(self.initial.shape)
+        self.pruned_acts = build_pruned_actions(self.initial.shape) if prune else None
+        self.pdbs = None
 
 
     def actions(self, state):
+        if self.pruned_acts is not None and state.move in self.pruned_acts:
+            return self.pruned_acts[state.move]
         return self.acts
 
     def result(self, state, action):
@@ -41,9 +44,260 @@ class Rubik2D(Problem):
         
         return State(state.shape, new_grid, state.answer, action)
 
+    def inverse(self, action):
+        return inverse_action(self.initial.shape, action)
+
     def goal_test(self, state):
         return state.grid == state.answer
 
+    def h(self, node):
+        if self.pdbs is None:
+            self.pdbs = load_pattern_databases(self.initial.shape, self.initial.answer)
+        masks = color_masks(node.state.grid)
+        return max((pdb[masks[color]] for color, pdb in self.pdbs), default=0)
+
+
+class PackedRubik2D(Problem):
+    """
+    Same problem as Rubik2D, but states are plain ints: the grid is packed row
+    by row, `bits` bits per cell, cell (i, j) starting at bit (i*n + j)*bits.
+    Every action is precomputed as a (mask, keep, lshift, rshift) entry so that
+    result() is a handful of integer operations instead of tuple slicing.
+    """
+
+    def __init__(self, initial, goal=None):
+        self.shape = initial.shape
+        self.colors = sorted(set(c for row in initial.grid + initial.answer for c in row))
+        self.codes = {c: i for i, c in enumerate(self.colors)}
+        self.bits = max(1, (len(self.colors) - 1).bit_length())
+        self.acts = build_actions(self.shape)
+
+        self.table = build_rotation_table(self.shape, self.bits)
+        self.pdbs = None
+
+        super().__init__(self.encode(initial.grid), self.encode(initial.answer))
+
+    def encode(self, grid):
+        m, n = self.shape
+        value = 0
+        for i in range(m):
+            for j in range(n):
+                value |= self.codes[grid[i][j]] << ((i*n + j) * self.bits)
+        return value
+
+    def decode(self, value, move="Init"):
+        return State(self.shape, self.unpack(value), self.unpack(self.goal), move)
+
+    def unpack(self, value):
+        m, n = self.shape
+        cell_mask = (1 << self.bits) - 1
+        return tuple(tuple(self.colors[(value >> ((i*n + j) * self.bits)) & cell_mask] for j in range(n))
+                     for i in range(m))
+
+    def actions(self, state):
+        return self.acts
+
+    def result(self, state, action):
+        return rotate(state, self.table[action])
+
+    def inverse(self, action):
+        return inverse_action(self.shape, action)
+
+    def goal_test(self, state):
+        return state == self.goal
+
+    def h(self, node):
+        if self.pdbs is None:
+            self.pdbs = load_pattern_databases(self.shape, self.unpack(self.goal))
+        masks = color_masks(self.unpack(node.state))
+        return max((pdb[masks[color]] for color, pdb in self.pdbs), default=0)
+
+
+def build_actions(shape):
+    """Return every "r:i:k" / "c:j:k" rotation for a grid of the given shape."""
+    m, n = shape
+    acts = []
+    for i in range(m):
+        for j in range(n-1):
+            acts.append(f"r:{i}:{j+1}")
+    for i in range(n):
+        for j in range(m-1):
+            acts.append(f"c:{i}:{j+1}")
+    return acts
+
+
+def build_pruned_actions(shape):
+    """
+    Map every action to the actions worth trying right after it. A second
+    rotation of the same line only gives a state reachable with one rotation
+    (or the parent itself), and rotations of two different rows (or two
+    different columns) commute, so after a move on line i of a kind only the
+    lines of that kind with an index above i and every line of the other
+    kind are kept.
+    """
+    acts = build_actions(shape)
+    pruned = {}
+    for action in acts:
+        kind, index, _ = action.split(":")
+        pruned[action] = [a for a in acts
+                          if a[0] != kind or int(a.split(":")[1]) > int(index)]
+    return pruned
+
+
+def build_rotation_table(shape, bits):
+    """
+    Map every action to the (mask, keep, lshift, rshift) entry used by rotate()
+    on a grid packed with `bits` bits per cell.
+    """
+    m, n = shape
+    full = (1 << (m * n * bits)) - 1
+    row_mask = (1 << (n * bits)) - 1
+    col_mask = 0
+    for i in range(m):
+        col_mask |= ((1 << bits) - 1) << (i * n * bits)
+
+    table = {}
+    for action in build_actions(shape):
+        kind, index, count = action.split(":")
+        index, count = int(index), int(count)
+        if kind == "r":
+            mask = row_mask << (index * n * bits)
+            lshift, rshift = count * bits, (n - count) * bits
+        else:
+            mask = col_mask << (index * bits)
+            lshift, rshift = count * n * bits, (m - count) * n * bits
+        table[action] = (mask, full ^ mask, lshift, rshift)
+    return table
+
+
+def rotate(value, entry):
+    """Apply one rotation table entry to a packed grid."""
+    mask, keep, lshift, rshift = entry
+    part = value & mask
+    return (value & keep) | (((part << lshift) | (part >> rshift)) & mask)
+
+
+def inverse_action(shape, action):
+    """Return the rotation undoing `action` on the same row/column."""
+    m, n = shape
+    kind, index, count = action.split(":")
+    length = n if kind == "r" else m
+    return f"{kind}:{index}:{length - int(count)}"
+
+
+####################
+# Pattern database #
+####################
+PDB_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pdb")
+
+
+class PatternDatabase:
+    """
+    Exact number of moves needed to bring the cells of a single color to their
+    goal positions, all other colors being ignored. A placement is a bitmask
+    over the m*n cells (bit i*n + j for cell (i, j)) and its distance is stored
+    at the combinatorial rank of that bitmask, one byte per placement.
+    Since any real move is also a move of the abstraction, every entry is a
+    lower bound of the real distance.
+    """
+
+    MAGIC = b"PDB1"
+
+    def __init__(self, shape, goal_mask, table=None):
+        m, n = shape
+        self.shape = shape
+        self.goal_mask = goal_mask
+        self.k = bin(goal_mask).count("1")
+        self.binomial = [[comb(i, j) for j in range(self.k + 1)] for i in range(m * n)]
+        self.table = self.build() if table is None else table
+
+    def __getitem__(self, mask):
+        return self.table[self.rank(mask)]
+
+    def rank(self, mask):
+        r, i = 0, 1
+        while mask:
+            low = mask & -mask
+            r += self.binomial[low.bit_length() - 1][i]
+            mask ^= low
+            i += 1
+        return r
+
+    def build(self):
+        """Breadth-first search backwards from the goal placement."""
+        m, n = self.shape
+        table = bytearray(b"\xff") * comb(m * n, self.k)
+        rotations = list(build_rotation_table(self.shape, 1).values())
+        table[self.rank(self.goal_mask)] = 0
+        frontier = deque([(self.goal_mask, 0)])
+        while frontier:
+            mask, dist = frontier.popleft()
+            for entry in rotations:
+                child = rotate(mask, entry)
+                r = self.rank(child)
+                if table[r] == 0xff:
+                    table[r] = dist + 1
+                    frontier.append((child, dist + 1))
+        return table
+
+    def save(self, path):
+        m, n = self.shape
+        with open(path, "wb") as fd:
+            fd.write(self.MAGIC + struct.pack("<BB", m, n))
+            fd.write(self.goal_mask.to_bytes((m * n + 7) // 8, "little"))
+            fd.write(self.table)
+
+    @classmethod
+    def load(cls, path, shape, goal_mask):
+        """Return the table stored at path, or None if it is missing or was
+        built for another shape or goal."""
+        m, n = shape
+        mask_size = (m * n + 7) // 8
+        try:
+            with open(path, "rb") as fd:
+                data = fd.read()
+        except FileNotFoundError:
+            return None
+        header = cls.MAGIC + struct.pack("<BB", m, n) + goal_mask.to_bytes(mask_size, "little")
+        if not data.startswith(header):
+            return None
+        table = bytearray(data[len(header):])
+        if len(table) != comb(m * n, bin(goal_mask).count("1")):
+            return None
+        return cls(shape, goal_mask, table)
+
+
+def color_masks(grid):
+    """Map each color of the grid to the bitmask of the cells holding it."""
+    n = len(grid[0])
+    masks = {}
+    for i, row in enumerate(grid):
+        for j, color in enumerate(row):
+            masks[color] = masks.get(color, 0) | (1 << (i * n + j))
+    return masks
+
+
+def load_pattern_databases(shape, answer, directory=PDB_DIR, max_entries=200000):
+    """
+    Return a list of (color, PatternDatabase) pairs for the goal grid `answer`,
+    loading each table from `directory` or building and saving it there first.
+    Colors whose table would exceed max_entries placements are skipped, which
+    keeps the max of the remaining tables admissible.
+    """
+    m, n = shape
+    pdbs = []
+    for color, mask in sorted(color_masks(answer).items()):
+        if comb(m * n, bin(mask).count("1")) > max_entries:
+            continue
+        path = os.path.join(directory, f"{m}x{n}_{mask:x}.pdb")
+        pdb = PatternDatabase.load(path, shape, mask)
+        if pdb is None:
+            pdb = PatternDatabase(shape, mask)
+            os.makedirs(directory, exist_ok=True)
+            pdb.save(path)
+        pdbs.append((color, pdb))
+    return pdbs
+
 
 ###############
 # State class #
@@ -68,6 +322,9 @@ class State:
     def __eq__(self, o):
         return self.grid == o.grid if type(o) == State else False
 
+    def __lt__(self, o):
+        return self.grid < o.grid
+
 
 def read_instance_file(filepath):
     with open(filepath) as fd:
@@ -86,18 +343,32 @@ def read_instance_file(filepath):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(f"Usage: ./rubik2D.py <path_to_instance_file>")
+    if len(sys.argv) < 2:
+        print(f"Usage: ./rubik2D.py <path_to_instance_file> [packed|prune] [bidir|astar|idastar]")
     filepath = sys.argv[1]
+    options = sys.argv[2:]
+    if "packed" in options and "prune" in options:
+        # the pruning looks at the last move, which the int states of PackedRubik2D do not keep
+        print("The packed and prune options cannot be combined", file=sys.stderr)
+        exit(1)
 
     shape, initial_grid, goal_grid = read_instance_file(filepath)
 
     init_state = State(shape, tuple(initial_grid), tuple(goal_grid), "Init")
-    problem = Rubik2D(init_state)
+    packed = "packed" in options
+    problem = PackedRubik2D(init_state) if packed else Rubik2D(init_state, prune="prune" in options)
 
     # Example of search
     start_timer = time.perf_counter()
-    node, nb_explored, remaining_nodes = breadth_first_graph_search(problem)
+    if "bidir" in options:
+        search = bidirectional_breadth_first_search
+    elif "astar" in options:
+        search = astar_search
+    elif "idastar" in options:
+        search = iterative_deepening_astar_search
+    else:
+        search = breadth_first_graph_search
+    node, nb_explored, remaining_nodes = search(problem)
     end_timer = time.perf_counter()
 
     # Example of print
@@ -105,7 +376,7 @@ if __name__ == "__main__":
 
     for n in path:
         # assuming that the __str__ function of state outputs the correct format
-        print(n.state)
+        print(problem.decode(n.state, n.action or "Init") if packed else n.state)
 
     print("* Execution time:\t", str(end_timer - start_timer))
     print("* Path cost to goal:\t", node.depth, "moves")
@@ -1,8 +1,11 @@
 from __future__ import annotations
 import ast
+from array import array
 from search import *
 import time
-import copy
+
+
+UNREACHABLE = 0xffff
 
 
 ####################
@@ -48,6 +51,85 @@ def h(state: State, final_pos: tuple) -> int:
     return h
 
 
+##############
+# Maze class #
+##############
+class Maze:
+    """
+    The Maze class holds everything about a PageCollect instance that does not change during the search: the walls, the
+    initial position of the pages and of the student, and the examiner's position. It is built once and shared by all the
+    states of the problem.
+
+    Attributes
+    ----------
+    nbr/nbc (int): number of rows/columns in the maze
+    grid (tuple of str): rows of the maze without the student nor the pages
+    player_pos (tuple of int): (x, y) initial position of the student
+    pages_pos (tuple of tuples of int): (x, y) position of every page, page i being bit i of a state's pages bitmask
+    page_index (dict): maps the (x, y) position of a page to its index in pages_pos
+    goal_pos (tuple of int): (x, y) position of the examiner
+    moves (dict): maps every free (x, y) position to a dict giving, for each action the student can make from there, the
+                  (x, y) position it leads to
+    """
+
+    def __init__(self, grid: list) -> None:
+        self.nbr = len(grid)
+        self.nbc = len(grid[0])
+        self.player_pos = None
+        self.goal_pos = None
+        pages_pos = []
+        rows = []
+        for y, row in enumerate(grid):
+            for x, cell in enumerate(row):
+                if cell == "@":
+                    self.player_pos = (x, y)
+                elif cell == "p":
+                    pages_pos.append((x, y))
+                elif cell == "X":
+                    self.goal_pos = (x, y)
+            rows.append(''.join(row).replace("@", " ").replace("p", " "))
+        self.grid = tuple(rows)
+        self.pages_pos = tuple(pages_pos)
+        self.page_index = {pos: i for i, pos in enumerate(self.pages_pos)}
+
+        self.moves = {}
+        for y, row in enumerate(self.grid):
+            for x, cell in enumerate(row):
+                if cell == "#":
+                    continue
+                self.moves[(x, y)] = {action: (x+dx, y+dy) for action, dx, dy in
+                                      (("s", 0, 1), ("n", 0, -1), ("e", 1, 0), ("w", -1, 0))
+                                      if self.grid[y+dy][x+dx] != "#"}
+
+    def distances_from(self, source: tuple) -> array:
+        """
+        Computes the true shortest-path distance from a position to every cell of the maze with a breadth-first search
+
+        Arguments
+        ---------
+        source: tuple of int (x, y) of the position to start from
+
+        Returns
+        -------
+        An array of unsigned shorts where the cell (x, y) is at index y*nbc + x, UNREACHABLE for walls and cells that
+        cannot be reached
+        """
+        dist = array('H', [UNREACHABLE]) * (self.nbr * self.nbc)
+        dist[source[1] * self.nbc + source[0]] = 0
+        layer = [source]
+        d = 0
+        while layer:
+            d += 1
+            next_layer = []
+            for pos in layer:
+                for x, y in self.moves[pos].values():
+                    if dist[y * self.nbc + x] == UNREACHABLE:
+                        dist[y * self.nbc + x] = d
+                        next_layer.append((x, y))
+            layer = next_layer
+        return dist
+
+
 ###############
 # State class #
 ###############
@@ -56,32 +138,62 @@ class State:
     The State class is used in AI problem solving to represent a precise reached step with various information about it.
     In this case, the State class is used in a pathfinding problem where you have to collect objects (pages) in the maze first
     (problem described in the PageCollect class below).
-    
+    A state only stores what changes from one step to the next, the maze itself being shared by all states, so creating,
+    comparing and hashing a state are O(1). The grid is only rendered when needed.
+
     Attributes
     ----------
-    nbr/nbc (int): number of rows/columns in the maze (same for all states of the same problem)
-    grid (matrix of str): representation of the maze, including the student, the pages to collect and the examiner
-    cost/heuristic (int): values corresponding to the distance already travelled/an estimation of the distance left to travel
+    maze (Maze): static description of the maze (same for all states of the same problem)
     player_pos (tuple of int): (x, y) position of the student in the maze
-    n_pages/pages_pos (int/list of tuples of int): number of remaining pages to collect/their (x, y) position in the maze
+    pages (int): bitmask of the pages still to collect, bit i standing for maze.pages_pos[i]
     """
 
-    def __init__(self, grid: list=[[]], cost: int=0, heuristic: int=0, player_pos: tuple=(0, 0), n_pages: int=0, pages_pos: list=[]) -> None:
-        self.nbr = len(grid)
-        self.nbc = len(grid[0])
-        self.grid = grid
-        self.cost = cost
-        self.heuristic = heuristic
+    __slots__ = ("maze", "player_pos", "pages")
+
+    def __init__(self, maze: Maze, player_pos: tuple, pages: int) -> None:
+        self.maze = maze
         self.player_pos = player_pos
-        self.n_pages = n_pages
-        self.pages_pos = pages_pos
+        self.pages = pages
+
+    @property
+    def nbr(self) -> int:
+        return self.maze.nbr
+
+    @property
+    def nbc(self) -> int:
+        return self.maze.nbc
+
+    @property
+    def n_pages(self) -> int:
+        return bin(self.pages).count("1")
+
+    @property
+    def pages_pos(self) -> list:
+        return [pos for i, pos in enumerate(self.maze.pages_pos) if self.pages >> i & 1]
+
+    @property
+    def grid(self) -> list:
+        """
+        Renders the maze with the student and the remaining pages
+
+        Returns
+        -------
+        A matrix of str representing the maze in this state
+        """
+        grid = [list(row) for row in self.maze.grid]
+        for x, y in self.pages_pos:
+            grid[y][x] = "p"
+        x, y = self.player_pos
+        grid[y][x] = "@"
+        return grid
 
     def __str__(self) -> str:
         return '\n'.join(''.join(row) for row in self.grid)
 
     def __eq__(self, other: State) -> bool:
         """
-        The __eq__ method is used to compare two state instances, by comparing their respective grids
+        The __eq__ method is used to compare two state instances, by comparing the student's position and the remaining
+        pages
 
         Arguments
         ---------
@@ -89,24 +201,24 @@ class State:
 
         Returns
         -------
-        A boolean indicating whether or not the two state instances have the same grid
+        A boolean indicating whether or not the two state instances have the same student position and remaining pages
         """
-        return other.grid == self.grid
+        return isinstance(other, State) and self.player_pos == other.player_pos and self.pages == other.pages
 
     def __hash__(self) -> int:
         """
-        The __hash__ method is used to obtain a hash value of the state instance by hashing its grid
+        The __hash__ method is used to obtain a hash value of the state instance by hashing the student's position and the
+        remaining pages
 
         Returns
         -------
-        An int value corresponding to the hash of the state's grid
+        An int value corresponding to the hash of the state
         """
-        tuple_grid = (tuple(l) for l in self.grid)
-        return hash(tuple_grid)
-    
+        return hash((self.player_pos, self.pages))
+
     def __lt__(self, other: State) -> bool:
         """
-        The __lt__ method is used to compare two state instances, by comparing the sum of their respective costs and heuristics
+        The __lt__ method gives an arbitrary but deterministic order between two state instances, used to break ties
 
         Arguments
         ---------
@@ -114,18 +226,16 @@ class State:
 
         Returns
         -------
-        A boolen indicating whether or not the sum of the cost and heuristic of this instance is less than the one of the other
-        instance
+        A boolean indicating whether or not this instance comes before the other one
         """
-        self_f = self.cost + self.heuristic
-        other_f = other.cost + other.heuristic
-        return self_f < other_f
-        
+        return (self.pages, self.player_pos) < (other.pages, other.player_pos)
+
     def from_string(string: str) -> State:
         lines = string.strip().splitlines()
-        return State(list(
+        maze = Maze(list(
             map(lambda x: list(x.strip()), lines)
         ))
+        return State(maze, maze.player_pos, (1 << len(maze.pages_pos)) - 1)
 
 
 
@@ -141,41 +251,32 @@ class PageCollect(Problem):
     Attributes
     ----------
     goal_pos (int): tuple of int (x, y) describing the goal's coordinates
+    dist (list of arrays): dist[i] holds the maze distance from the i-th page (the exit for i = number of pages) to every
+                           cell, see Maze.distances_from
+    pair_dist (list of lists of int): maze distances between the pages and the exit, indexed as dist
     """
-    def __init__(self, initial: State) -> None:
+    def __init__(self, initial: State, heuristic: str = "mst") -> None:
         """
-        Initializes the goal state using the initial state's grid, then initializes the PageCollect problem using the
-        initial and goal states
+        Initializes the goal state (student on the examiner, no page left) from the initial state's maze, precomputes the
+        maze distances from every page and from the exit, then initializes the PageCollect problem using the initial and
+        goal states
 
         Arguments
         ---------
         initial: State instance representing the initial state of the problem
+        heuristic: name of the heuristic used by h, one of "manhattan", "maze" or "mst"
         """
-        final_goal = []
-        n_pages = 0
-        pages_pos = []
-        for nth_row in range(initial.nbr):
-            goal_row = []
-            for nth_col in range(initial.nbc):
-                if initial.grid[nth_row][nth_col] == "@":
-                    goal_row.append(" ")
-                    initial.player_pos = (nth_col, nth_row)
-                elif initial.grid[nth_row][nth_col] == "p":
-                    goal_row.append(" ")
-                    n_pages += 1
-                    pages_pos.append((nth_col, nth_row))
-                elif initial.grid[nth_row][nth_col] == "X":
-                    goal_row.append("@")
-                    self.goal_pos = (nth_col, nth_row)
-                else:
-                    goal_row.append(initial.grid[nth_row][nth_col])
-            final_goal.append(goal_row)
-        initial.n_pages = n_pages
-        initial.pages_pos = pages_pos
-        goal = State(final_goal, 0, 0, self.goal_pos, 0, [])
+        self.maze = initial.maze
+        self.goal_pos = self.maze.goal_pos
+        goal = State(self.maze, self.goal_pos, 0)
         super().__init__(initial, goal=goal)
 
-        
+        targets = self.maze.pages_pos + (self.goal_pos,)
+        self.exit = len(self.maze.pages_pos)
+        self.dist = [self.maze.distances_from(pos) for pos in targets]
+        self.pair_dist = [[d[y * self.maze.nbc + x] for x, y in targets] for d in self.dist]
+        self.mst_cache = {}
+        self.heuristic = getattr(self, "h_" + heuristic)
 
     def actions(self, state: State) -> list:
         """
@@ -189,20 +290,8 @@ class PageCollect(Problem):
         -------
         A list of strings depicting in which of the four direction (N, S, E, W) the student can currently go
         """
-        acts = []
-        grid = state.grid
-        player_x, player_y = state.player_pos
-        if grid[player_y+1][player_x] != "#":
-            acts.append("s")
-        if grid[player_y-1][player_x] != "#":
-            acts.append("n")
-        if grid[player_y][player_x+1] != "#":
-            acts.append("e")
-        if grid[player_y][player_x-1] != "#":
-            acts.append("w")
-        return acts
+        return list(self.maze.moves[state.player_pos])
 
-    
     def result(self, state: State, action: str) -> State:
         """
         Returns a new State instance representing in which state the problem will be next when applying an action to the
@@ -218,40 +307,20 @@ class PageCollect(Problem):
         A new State instance corresponding to the previous one with an additional move from the student, with updated pages
         if necessary
         """
-        grid = copy.deepcopy(state.grid)
-        old_x, old_y = state.player_pos
-
-        if action == 's':
-            new_x, new_y = old_x, old_y+1
-        elif action == 'n':
-            new_x, new_y = old_x, old_y-1
-        elif action == 'e':
-            new_x, new_y = old_x+1, old_y
-        elif action == 'w':
-            new_x, new_y = old_x-1, old_y
-        
-        n_pages = state.n_pages
-        pages_pos = copy.deepcopy(state.pages_pos)
-        if grid[new_y][new_x] == "p":
-            n_pages -= 1
-            pages_pos.remove((new_x, new_y))
-        
-        if old_y == self.goal_pos[1] and old_x == self.goal_pos[0]:
-            grid[old_y][old_x] = "X"
-        else:
-            grid[old_y][old_x] = " "
-        grid[new_y][new_x] = "@"
-
-        new_state = State(grid, state.cost+1, 0, (new_x, new_y), n_pages, pages_pos)
-        new_state.heuristic = h(new_state, self.goal_pos)
-        return new_state
+        new_pos = self.maze.moves[state.player_pos][action]
+        pages = state.pages
+        page = self.maze.page_index.get(new_pos)
+        if page is not None:
+            pages &= ~(1 << page)
+        return State(self.maze, new_pos, pages)
 
     def goal_test(self, state: State) -> bool:
         return state == self.goal
     
     def h(self, node: Node) -> int:
         """
-        The h function returns the heuristic value corresponding to a node given the final goal
+        The h function returns the heuristic value corresponding to a node given the final goal, using the heuristic
+        selected when creating the problem
 
         Arguments
         ---------
@@ -259,8 +328,23 @@ class PageCollect(Problem):
 
         Returns
         -------
-        A heuristic value computed by using the sum of the manhattan distances to each page, or to the goal if there
-        are no more pages to collect
+        A heuristic value for the node
+        """
+        return self.heuristic(node)
+
+    def h_manhattan(self, node: Node) -> int:
+        """
+        The h_manhattan function returns the manhattan distance to the closest page, or to the goal if there are no more
+        pages to collect
+
+        Arguments
+        ---------
+        node: a Node instance to compute the heuristic value of
+
+        Returns
+        -------
+        A heuristic value computed by using the manhattan distances to each page, or to the goal if there are no more
+        pages to collect
         """
         h=0
         if (node.state.n_pages !=0):
@@ -273,26 +357,104 @@ class PageCollect(Problem):
             h = dist_man(node.state.player_pos, self.goal_pos)
         return h
 
-    def load(path):
+    def h_maze(self, node: Node) -> int:
+        """
+        The h_maze function returns, over the remaining pages, the largest maze distance of a trip from the student to the
+        page and from the page to the exit, since every one of these trips is part of the remaining path
+
+        Arguments
+        ---------
+        node: a Node instance to compute the heuristic value of
+
+        Returns
+        -------
+        An admissible heuristic value based on the true maze distances
+        """
+        x, y = node.state.player_pos
+        cell = y * self.maze.nbc + x
+        pages = node.state.pages
+        if pages == 0:
+            return self.dist[self.exit][cell]
+        return max(self.dist[i][cell] + self.pair_dist[i][self.exit]
+                   for i in range(self.exit) if pages >> i & 1)
+
+    def h_mst(self, node: Node) -> int:
+        """
+        The h_mst function returns the maze distance from the student to the closest remaining page, plus the weight of a
+        minimum spanning tree over the remaining pages and the exit (the rest of the path goes through all of them)
+
+        Arguments
+        ---------
+        node: a Node instance to compute the heuristic value of
+
+        Returns
+        -------
+        An admissible heuristic value based on the true maze distances, never lower than h_maze's first trip
+        """
+        x, y = node.state.player_pos
+        cell = y * self.maze.nbc + x
+        pages = node.state.pages
+        if pages == 0:
+            return self.dist[self.exit][cell]
+        nearest = min(self.dist[i][cell] for i in range(self.exit) if pages >> i & 1)
+        return max(nearest + self.mst(pages), self.h_maze(node))
+
+    def mst(self, pages: int) -> int:
+        """
+        Computes (once per set of pages) the weight of a minimum spanning tree over the given pages and the exit, using
+        Prim's algorithm on the maze distances
+
+        Arguments
+        ---------
+        pages: bitmask of the pages to include
+
+        Returns
+        -------
+        The weight of the minimum spanning tree
+        """
+        if pages in self.mst_cache:
+            return self.mst_cache[pages]
+        nodes = [i for i in range(self.exit) if pages >> i & 1]
+        best = {i: self.pair_dist[self.exit][i] for i in nodes}
+        weight = 0
+        while best:
+            i = min(best, key=best.get)
+            weight += best.pop(i)
+            for j in best:
+                if self.pair_dist[i][j] < best[j]:
+                    best[j] = self.pair_dist[i][j]
+        self.mst_cache[pages] = weight
+        return weight
+
+    def load(path, heuristic="mst"):
+        """
+        Loads the instance file at path as a PageCollect problem using the given heuristic. The distances and heuristic
+        values are integers, so A* can use a BucketQueue frontier:
+
+        >>> problem = PageCollect.load("instances/i01")
+        >>> astar_search(problem, buckets=True)[0].path_cost == astar_search(problem)[0].path_cost
+        True
+        """
         with open(path, 'r') as f:
             lines = f.readlines()
             
         state = State.from_string(''.join(lines))
-        return PageCollect(state)
+        return PageCollect(state, heuristic)
 
 
 
 #####################
 # Launch the search #
 #####################
-problem = PageCollect.load(sys.argv[1])
+if __name__ == "__main__":
+    problem = PageCollect.load(sys.argv[1])
 
-# Example of search
-node = astar_search(problem)
+    # Example of search, "--buckets" uses a BucketQueue frontier
+    node, nb_explored, remaining_nodes = astar_search(problem, buckets="--buckets" in sys.argv[2:])
 
-# example of print
-path = node.path()
+    # example of print
+    path = node.path()
 
-for n in path:
-    print(n.state)  # assuming that the __str__ function of state outputs the correct format
-    print()
+    for n in path:
+        print(n.state)  # assuming that the __str__ function of state outputs the correct format
+        print()
@@ -7,6 +7,7 @@ functions.
 """
 import numpy as np
 import sys
+import time
 from collections import deque
 
 from utils import *
@@ -56,6 +57,13 @@ class Problem:
         and action. The default method costs 1 for every step in the path."""
         return c + 1
 
+    def inverse(self, action):
+        """Return the action that undoes the given action, i.e.
+        result(result(state, action), inverse(action)) == state. Only needed
+        by searches that also explore backwards from self.goal, such as
+        bidirectional_breadth_first_search."""
+        raise NotImplementedError
+
     def value(self, state):
         """For optimization problems, each state has a value. Hill Climbing
         and related algorithms try to maximize this value."""
@@ -171,6 +179,90 @@ class SimpleProblemSolvingAgentProgram:
         raise NotImplementedError
 
 
+# ______________________________________________________________________________
+# Generic search engine
+
+
+class SearchStats:
+    """Counters gathered by graph_search: the number of expanded nodes, of
+    generated children, of children dropped because their state was already
+    reached at no higher cost, the largest and final frontier sizes and the
+    wall time in seconds."""
+
+    def __init__(self):
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.max_frontier = 0
+        self.remaining = 0
+        self.wall_time = 0.0
+
+    def __repr__(self):
+        return ("<SearchStats expanded={} generated={} duplicates={} max_frontier={} remaining={} wall_time={:.3f}s>"
+                .format(self.expanded, self.generated, self.duplicates, self.max_frontier, self.remaining,
+                        self.wall_time))
+
+
+def graph_search(problem, frontier, early_goal_test=None, prune_duplicates=True):
+    """
+    Search through the successors of a problem to find a goal, the order of
+    expansion being given by the frontier: FIFOQueue for breadth-first,
+    Stack for depth-first, PriorityQueue or BucketQueue for best-first.
+    The frontier must be empty and provide append, pop and len.
+    A single dict maps every state ever generated (in the frontier or
+    already expanded) to the lowest path cost it was reached with, so a
+    duplicate is detected in O(1). With a priority frontier a state reached
+    again by a cheaper path is queued again and the outdated node is skipped
+    when popped; with a FIFO or LIFO frontier the first path is kept.
+    prune_duplicates=False gives a tree search.
+    early_goal_test tests children when they are generated instead of when
+    they are expanded. It defaults to True for FIFO and LIFO frontiers, where
+    it saves a whole layer, and must stay False for best-first searches.
+    Returns the goal node (or None) and a SearchStats.
+    """
+    start = time.perf_counter()
+    stats = SearchStats()
+    ordered = isinstance(frontier, (PriorityQueue, BucketQueue))
+    if early_goal_test is None:
+        early_goal_test = not ordered
+
+    node = Node(problem.initial)
+    reached = {node.state: node.path_cost}
+    if early_goal_test and problem.goal_test(node.state):
+        stats.wall_time = time.perf_counter() - start
+        return node, stats
+    frontier.append(node)
+
+    found = None
+    while frontier:
+        node = frontier.pop()
+        if prune_duplicates and ordered and node.path_cost > reached[node.state]:
+            continue
+        stats.expanded += 1
+        if not early_goal_test and problem.goal_test(node.state):
+            found = node
+            break
+        for child in node.expand(problem):
+            stats.generated += 1
+            if prune_duplicates and child.state in reached:
+                if not ordered or reached[child.state] <= child.path_cost:
+                    stats.duplicates += 1
+                    continue
+            if early_goal_test and problem.goal_test(child.state):
+                found = child
+                break
+            if prune_duplicates:
+                reached[child.state] = child.path_cost
+            frontier.append(child)
+        if found:
+            break
+        stats.max_frontier = max(stats.max_frontier, len(frontier))
+
+    stats.remaining = len(frontier)
+    stats.wall_time = time.perf_counter() - start
+    return found, stats
+
+
 # ______________________________________________________________________________
 # Uninformed Search algorithms
 
@@ -180,20 +272,10 @@ def breadth_first_tree_search(problem):
     [Figure 3.7]
     Search the shallowest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
-    The argument frontier should be an empty queue.
     Repeats infinitely in case of loops.
     """
-
-    frontier = deque([Node(problem.initial)])  # FIFO queue
-
-    explored_nodes = 0
-    while frontier:
-        node = frontier.popleft()
-        explored_nodes += 1
-        if problem.goal_test(node.state):
-            return node, explored_nodes, len(frontier)
-        frontier.extend(node.expand(problem))
-    return None, explored_nodes, len(frontier)
+    node, stats = graph_search(problem, FIFOQueue(), early_goal_test=False, prune_duplicates=False)
+    return node, stats.expanded, stats.remaining
 
 
 def depth_first_tree_search(problem):
@@ -201,20 +283,10 @@ def depth_first_tree_search(problem):
     [Figure 3.7]
     Search the deepest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
-    The argument frontier should be an empty queue.
     Repeats infinitely in case of loops.
     """
-
-    frontier = [Node(problem.initial)]  # Stack
-
-    explored_nodes = 0
-    while frontier:
-        node = frontier.pop()
-        explored_nodes += 1
-        if problem.goal_test(node.state):
-            return node, explored_nodes, len(frontier)
-        frontier.extend(node.expand(problem))
-    return None, explored_nodes, len(frontier)
+    node, stats = graph_search(problem, Stack(), early_goal_test=False, prune_duplicates=False)
+    return node, stats.expanded, stats.remaining
 
 
 def depth_first_graph_search(problem):
@@ -222,84 +294,90 @@ def depth_first_graph_search(problem):
     [Figure 3.7]
     Search the deepest nodes in the search tree first.
     Search through the successors of a problem to find a goal.
-    The argument frontier should be an empty queue.
     Does not get trapped by loops.
     If two paths reach a state, only use the first one.
     """
-    frontier = [(Node(problem.initial))]  # Stack
-
-    explored = set()
-    explored_nodes = 0
-    while frontier:
-        node = frontier.pop()
-        explored_nodes += 1
-        if problem.goal_test(node.state):
-            return node, explored_nodes, len(frontier)
-        explored.add(node.state)
-        frontier.extend(child for child in node.expand(problem)
-                        if child.state not in explored and child not in frontier)
-    return None, explored_nodes, len(frontier)
+    node, stats = graph_search(problem, Stack())
+    return node, stats.expanded, stats.remaining
 
 
 def breadth_first_graph_search(problem):
     """[Figure 3.11]
-    Note that this function can be implemented in a
-    single line as below:
-    return graph_search(problem, FIFOQueue())
+    Breadth-first graph search, goal-testing the children as soon as they
+    are generated.
+    """
+    node, stats = graph_search(problem, FIFOQueue())
+    return node, stats.expanded, stats.remaining
+
+
+def bidirectional_breadth_first_search(problem):
+    """
+    Breadth-first search run simultaneously from problem.initial and from
+    problem.goal, one full layer at a time on the smaller side, until both
+    searches meet. Requires every action to be invertible (Problem.inverse)
+    and the backward search expands a state with the same problem.actions as
+    the forward one. With unit step costs the returned path is optimal.
     """
     node = Node(problem.initial)
     if problem.goal_test(node.state):
-        return node
-    frontier = deque([node])
-    explored = dict()
+        return node, 0, 0
+    if problem.goal is None:
+        raise ValueError("Bidirectional search needs an explicit goal state.")
+
+    goal_node = Node(problem.goal)
+    forward, backward = {node.state: node}, {goal_node.state: goal_node}
+    forward_layer, backward_layer = [node], [goal_node]
     explored_nodes = 0
-    while frontier:
-        node = frontier.popleft()
-        if node.state in explored: 
-            continue
-        explored_nodes += 1
-        explored[node.state] = True
-        for child in node.expand(problem):
-            # if hash(child.state) in explored.keys():
-                # print("visited alredy")
-            if child.state not in explored:
-                if problem.goal_test(child.state):
-                    return child, explored_nodes, len(frontier)
-                frontier.append(child)
-    return None, explored_nodes, len(frontier)
+    best = None
+    while forward_layer and backward_layer and best is None:
+        expand_forward = len(forward_layer) <= len(backward_layer)
+        layer = forward_layer if expand_forward else backward_layer
+        visited, other = (forward, backward) if expand_forward else (backward, forward)
+        next_layer = []
+        for node in layer:
+            explored_nodes += 1
+            for child in node.expand(problem):
+                if child.state in visited:
+                    continue
+                visited[child.state] = child
+                next_layer.append(child)
+                if child.state in other:
+                    meet = (child, other[child.state]) if expand_forward else (other[child.state], child)
+                    if best is None or meet[0].depth + meet[1].depth < best[0].depth + best[1].depth:
+                        best = meet
+        if expand_forward:
+            forward_layer = next_layer
+        else:
+            backward_layer = next_layer
+
+    remaining_nodes = len(forward_layer) + len(backward_layer)
+    if best is None:
+        return None, explored_nodes, remaining_nodes
+
+    # Replay the backward half from the meeting point to the goal
+    node, back = best
+    while back.parent is not None:
+        node = node.child_node(problem, problem.inverse(back.action))
+        back = back.parent
+    return node, explored_nodes, remaining_nodes
 
 
-def best_first_graph_search(problem, f, display=False):
+def best_first_graph_search(problem, f, display=False, buckets=False):
     """Search the nodes with the lowest f scores first.
     You specify the function f(node) that you want to minimize; for example,
     if f is a heuristic estimate to the goal, then we have greedy best
     first search; if f is node.depth then we have breadth-first search.
     There is a subtlety: the line "f = memoize(f, 'f')" means that the f
     values will be cached on the nodes as they are computed. So after doing
-    a best first search you can examine the f values of the path returned."""
+    a best first search you can examine the f values of the path returned.
+    If buckets is True, the frontier is a BucketQueue instead of a heap,
+    which requires f to return small non-negative integers."""
     f = memoize(f, 'f')
-    node = Node(problem.initial)
-    frontier = PriorityQueue('min', f)
-    frontier.append(node)
-    explored = set()
-    explored_nodes = 0
-
-    while frontier:
-        node = frontier.pop()
-        explored_nodes += 1
-        if problem.goal_test(node.state):
-            if display:
-                print(len(explored), "paths have been expanded and", len(frontier), "paths remain in the frontier")
-            return node, explored_nodes, len(frontier)
-        explored.add(node.state)
-        for child in node.expand(problem):
-            if child.state not in explored and child not in frontier:
-                frontier.append(child)
-            elif child in frontier:
-                if f(child) < frontier[child]:
-                    del frontier[child]
-                    frontier.append(child)
-    return None, explored_nodes, len(frontier)
+    frontier = BucketQueue(f) if buckets else PriorityQueue('min', f)
+    node, stats = graph_search(problem, frontier)
+    if display and node:
+        print(stats.expanded, "paths have been expanded and", stats.remaining, "paths remain in the frontier")
+    return node, stats.expanded, stats.remaining
 
 
 def uniform_cost_search(problem, display=False):
@@ -308,35 +386,44 @@ def uniform_cost_search(problem, display=False):
 
 
 def depth_limited_search(problem, limit=50):
-    """[Figure 3.17]"""
-
-    explored_nodes = 0
-    def recursive_dls(node, problem, limit, explored_nodes):
+    """[Figure 3.17]
+    Iterative version: the recursion is replaced by a stack holding, for each
+    node of the current path, the iterator over its remaining children.
+    Returns the goal node, 'cutoff' if some node was not expanded because of
+    the limit or None otherwise, with the number of explored nodes and the
+    size of the stack at the end."""
+    node = Node(problem.initial)
+    explored_nodes = 1
+    if problem.goal_test(node.state):
+        return node, explored_nodes, 0
+    if limit == 0:
+        return 'cutoff', explored_nodes, 0
+
+    cutoff_occurred = False
+    stack = [iter(node.expand(problem))]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            continue
         explored_nodes += 1
-        if problem.goal_test(node.state):
-            return node, explored_nodes
-        elif limit == 0:
-            return 'cutoff'
+        if problem.goal_test(child.state):
+            return child, explored_nodes, len(stack)
+        if child.depth == limit:
+            cutoff_occurred = True
         else:
-            cutoff_occurred = False
-            for child in node.expand(problem):
-                result = recursive_dls(child, problem, limit - 1)
-                if result == 'cutoff':
-                    cutoff_occurred = True
-                elif result is not None:
-                    return result
-            return 'cutoff' if cutoff_occurred else None
-
-    # Body of depth_limited_search:
-    return recursive_dls(Node(problem.initial), problem, limit)
+            stack.append(iter(child.expand(problem)))
+    return ('cutoff' if cutoff_occurred else None), explored_nodes, 0
 
 
 def iterative_deepening_search(problem):
     """[Figure 3.18]"""
+    explored_nodes = 0
     for depth in range(sys.maxsize):
-        result = depth_limited_search(problem, depth)
+        result, nb_explored, remaining_nodes = depth_limited_search(problem, depth)
+        explored_nodes += nb_explored
         if result != 'cutoff':
-            return result
+            return result, explored_nodes, remaining_nodes
 
 
 # ______________________________________________________________________________
@@ -349,12 +436,105 @@ greedy_best_first_graph_search = best_first_graph_search
 # Greedy best-first search is accomplished by specifying f(n) = h(n).
 
 
-def astar_search(problem, h=None, display=False):
+def astar_search(problem, h=None, display=False, buckets=False):
     """A* search is best-first graph search with f(n) = g(n)+h(n).
     You need to specify the h function when you call astar_search, or
-    else in your Problem subclass."""
+    else in your Problem subclass. With integer path costs and heuristic
+    values, buckets=True uses a BucketQueue frontier (see
+    best_first_graph_search)."""
+    h = memoize(h or problem.h, 'h')
+    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display, buckets)
+
+
+class TranspositionTable:
+    """Fixed-size table remembering, during one iteration of
+    iterative_deepening_astar_search, the lowest path cost each state was
+    expanded with. A state goes to the slot hash(state) % size; on a
+    collision the entry of an older iteration, or the one reached with a
+    higher cost (thus owning the smaller subtree), is replaced. The memory
+    used therefore never grows beyond size entries."""
+
+    def __init__(self, size):
+        self.size = size
+        self.slots = [None] * size
+
+    def visit(self, state, cost, iteration):
+        """Return False if state was already expanded with a path cost of at
+        most cost during this iteration, otherwise record it and return
+        True."""
+        index = hash(state) % self.size
+        entry = self.slots[index]
+        if entry is not None and entry[2] == iteration and entry[1] <= cost:
+            if entry[0] == state:
+                return False
+            return True
+        self.slots[index] = (state, cost, iteration)
+        return True
+
+
+def iterative_deepening_astar_search(problem, h=None, table_size=1 << 16, iterations=None, display=False):
+    """Iterative deepening A* (IDA*): repeated depth-first searches where a
+    node is only expanded if f(n) = g(n)+h(n) is within the current bound,
+    the next bound being the smallest f that exceeded it. Memory is linear in
+    the depth of the solution, plus a TranspositionTable of table_size
+    entries (table_size=0 disables it) that prunes states already expanded
+    at no higher cost in the same iteration; states on the current path are
+    always pruned. The search is iterative, with a stack of child iterators.
+    If iterations is a list, a (bound, SearchStats) pair is appended to it
+    for every iteration. With an admissible h the solution is optimal."""
     h = memoize(h or problem.h, 'h')
-    return best_first_graph_search(problem, lambda n: n.path_cost + h(n), display)
+    table = TranspositionTable(table_size) if table_size else None
+    root = Node(problem.initial)
+    if problem.goal_test(root.state):
+        return root, 0, 0
+
+    explored_nodes = 0
+    bound = h(root)
+    for iteration in range(sys.maxsize):
+        start = time.perf_counter()
+        stats = SearchStats()
+        next_bound = np.inf
+        found = None
+        path = [root]
+        on_path = {root.state}
+        stack = [iter(root.expand(problem))]
+        stats.expanded += 1
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                on_path.discard(path.pop().state)
+                continue
+            stats.generated += 1
+            if child.state in on_path:
+                stats.duplicates += 1
+                continue
+            f = child.path_cost + h(child)
+            if f > bound:
+                next_bound = min(next_bound, f)
+                continue
+            if problem.goal_test(child.state):
+                found = child
+                break
+            if table is not None and not table.visit(child.state, child.path_cost, iteration):
+                stats.duplicates += 1
+                continue
+            stats.expanded += 1
+            path.append(child)
+            on_path.add(child.state)
+            stack.append(iter(child.expand(problem)))
+            stats.max_frontier = max(stats.max_frontier, len(stack))
+
+        stats.remaining = len(stack)
+        stats.wall_time = time.perf_counter() - start
+        explored_nodes += stats.expanded
+        if iterations is not None:
+            iterations.append((bound, stats))
+        if display:
+            print("bound", bound, stats)
+        if found or next_bound == np.inf:
+            return found, explored_nodes, stats.remaining
+        bound = next_bound
 
 
 # ______________________________________________________________________________
@@ -2,7 +2,9 @@
 
 import heapq
 import functools
+import itertools
 import random
+from collections import deque
 
 
 def is_in(elt, seq):
@@ -63,9 +65,21 @@ def probability(p):
 
 
 # ______________________________________________________________________________
-# Queues: Stack, FIFOQueue, PriorityQueue
+# Queues: Stack, FIFOQueue, PriorityQueue, BucketQueue
 # Stack and FIFOQueue are implemented as list and collection.deque
-# PriorityQueue is implemented here
+# PriorityQueue and BucketQueue are implemented here
+
+
+def Stack():
+    """Return an empty list, suitable as a Last-In-First-Out Queue."""
+    return []
+
+
+class FIFOQueue(deque):
+    """A First-In-First-Out Queue: a deque whose pop() takes the oldest item."""
+
+    def pop(self):
+        return self.popleft()
 
 
 class PriorityQueue:
@@ -73,10 +87,19 @@ class PriorityQueue:
     order) is returned first.
     If order is 'min', the item with minimum f(x) is
     returned first; if order is 'max', then it is the item with maximum f(x).
-    Also supports dict-like lookup."""
+    Also supports dict-like lookup.
+    The heap is indexed by a dict from item to heap entry, so membership,
+    lookup and deletion do not scan the heap: a deleted entry is only marked
+    as removed and skipped when it reaches the top. An item appended while
+    an equal item is queued replaces it. Items with the same f(x) are popped
+    in insertion order."""
+
+    REMOVED = object()
 
     def __init__(self, order='min', f=lambda x: x):
         self.heap = []
+        self.entries = {}
+        self.counter = itertools.count()
         if order == 'min':
             self.f = f
         elif order == 'max':  # now item with max f(x)
@@ -86,7 +109,11 @@ class PriorityQueue:
 
     def append(self, item):
         """Insert item at its correct position."""
-        heapq.heappush(self.heap, (self.f(item), item))
+        if item in self.entries:
+            self.entries.pop(item)[2] = self.REMOVED
+        entry = [self.f(item), next(self.counter), item]
+        self.entries[item] = entry
+        heapq.heappush(self.heap, entry)
 
     def extend(self, items):
         """Insert each item in items at its correct position."""
@@ -96,34 +123,82 @@ class PriorityQueue:
     def pop(self):
         """Pop and return the item (with min or max f(x) value)
         depending on the order."""
-        if self.heap:
-            return heapq.heappop(self.heap)[1]
-        else:
-            raise Exception('Trying to pop from empty PriorityQueue.')
+        while self.heap:
+            item = heapq.heappop(self.heap)[2]
+            if item is not self.REMOVED:
+                del self.entries[item]
+                return item
+        raise Exception('Trying to pop from empty PriorityQueue.')
 
     def __len__(self):
         """Return current capacity of PriorityQueue."""
-        return len(self.heap)
+        return len(self.entries)
 
     def __contains__(self, key):
         """Return True if the key is in PriorityQueue."""
-        return any([item == key for _, item in self.heap])
+        return key in self.entries
 
     def __getitem__(self, key):
-        """Returns the first value associated with key in PriorityQueue.
+        """Returns the value associated with key in PriorityQueue.
         Raises KeyError if key is not present."""
-        for value, item in self.heap:
-            if item == key:
-                return value
-        raise KeyError(str(key) + " is not in the priority queue")
+        try:
+            return self.entries[key][0]
+        except KeyError:
+            raise KeyError(str(key) + " is not in the priority queue")
 
     def __delitem__(self, key):
-        """Delete the first occurrence of key."""
+        """Delete the occurrence of key."""
         try:
-            del self.heap[[item == key for _, item in self.heap].index(True)]
-        except ValueError:
+            self.entries.pop(key)[2] = self.REMOVED
+        except KeyError:
             raise KeyError(str(key) + " is not in the priority queue")
-        heapq.heapify(self.heap)
+
+
+class BucketQueue:
+    """A Queue for small non-negative integer priorities f(x), the item with
+    minimum f(x) being returned first and items with the same f(x) in
+    insertion order. Items go in one bucket per priority, so append is O(1)
+    and pop is amortized O(1) as long as the priorities mostly increase
+    (e.g. A* with a consistent heuristic and unit costs).
+
+    >>> q = BucketQueue(len)
+    >>> q.extend(['abc', 'a', 'xyz', 'ab'])
+    >>> [q.pop() for _ in range(len(q))]
+    ['a', 'ab', 'abc', 'xyz']
+    """
+
+    def __init__(self, f=lambda x: x):
+        self.buckets = []
+        self.current = 0
+        self.size = 0
+        self.f = f
+
+    def append(self, item):
+        """Insert item in the bucket of its priority."""
+        key = self.f(item)
+        while len(self.buckets) <= key:
+            self.buckets.append(deque())
+        self.buckets[key].append(item)
+        self.current = min(self.current, key)
+        self.size += 1
+
+    def extend(self, items):
+        """Insert each item in items in the bucket of its priority."""
+        for item in items:
+            self.append(item)
+
+    def pop(self):
+        """Pop and return the oldest item with the minimum f(x) value."""
+        if not self.size:
+            raise Exception('Trying to pop from empty BucketQueue.')
+        while not self.buckets[self.current]:
+            self.current += 1
+        self.size -= 1
+        return self.buckets[self.current].popleft()
+
+    def __len__(self):
+        """Return current capacity of BucketQueue."""
+        return self.size
 
 
 # ______________________________________________________________________________
@@ -0,0 +1,363 @@
+"""
+Pure Python CDCL SAT solver, used as an in-process alternative to the MiniSat
+executable (see minisat.py).
+
+Variables are the integers 1..n and clauses are sequences of non-zero integers
+as in the DIMACS format. Internally, the literal of variable v is 2*v if it is
+positive and 2*v+1 if it is negated, so that the negation of a literal l is
+l ^ 1 and its variable is l >> 1.
+
+The solver implements the usual components of a conflict-driven clause
+learning solver:
+- two watched literals per clause for unit propagation,
+- first-UIP clause learning with a simple minimisation of the learnt clause,
+- VSIDS decision heuristic (with phase saving) on a lazy-deletion heap,
+- Luby restarts, at which half of the learnt clauses may be forgotten,
+- incremental solving: clauses can be added between calls to solve, which
+  accepts assumptions (literals taken as the first decisions, as in MiniSat),
+  and the learnt clauses are kept from one call to the next.
+
+Example:
+
+>>> solver = Solver(3)
+>>> solver.add_clauses([(-1, 2), (-2, -3), (1,)])
+True
+>>> solver.solve()
+True
+>>> solver.model()
+[1, 2]
+"""
+
+import heapq
+
+
+def luby(i):
+    """i-th element (starting at 0) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 ..."""
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+
+class Solver:
+
+    def __init__(self, n=0, restart_base=100, var_decay=0.95):
+        self.n = 0
+        self.ok = True
+        self.restart_base = restart_base
+        self.var_decay = var_decay
+        # value[l] is 1 if literal l is true, -1 if it is false and 0 if it is unassigned
+        self.value = [0, 0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.polarity = [False]
+        self.seen = bytearray(1)
+        # watches[l] are the clauses whose first or second literal is l
+        self.watches = [[], []]
+        self.clauses = []
+        self.learnts = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.heap = []
+        self.var_inc = 1.0
+        self.max_learnts = 0
+        self.assumptions = []
+        self.assignment = None
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.new_vars(n)
+
+    def new_vars(self, n):
+        """Make sure that the variables 1..n exist."""
+        for v in range(self.n + 1, n + 1):
+            self.value += [0, 0]
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.polarity.append(False)
+            self.seen.append(0)
+            self.watches += [[], []]
+            heapq.heappush(self.heap, (0.0, v))
+        self.n = max(self.n, n)
+
+    def add_clauses(self, clauses):
+        """Add every clause of clauses, return False if the formula is found unsatisfiable."""
+        for clause in clauses:
+            if not self.add_clause(clause):
+                return False
+        return True
+
+    def add_clause(self, clause):
+        """Add a clause (a sequence of DIMACS literals), return False if the formula is found unsatisfiable."""
+        if not self.ok:
+            return False
+        self.new_vars(max((abs(x) for x in clause), default=0))
+        value = self.value
+        lits = set()
+        for x in clause:
+            lit = 2 * x if x > 0 else -2 * x + 1
+            if lit ^ 1 in lits or value[lit] == 1:
+                # tautology or already satisfied at level 0
+                return True
+            if value[lit] == 0:
+                lits.add(lit)
+        lits = list(lits)
+        if len(lits) == 0:
+            self.ok = False
+        elif len(lits) == 1:
+            self.enqueue(lits[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.clauses.append(lits)
+            self.watches[lits[0]].append(lits)
+            self.watches[lits[1]].append(lits)
+        return self.ok
+
+    #####################
+    #    Propagation    #
+    #####################
+    def enqueue(self, lit, reason):
+        self.value[lit] = 1
+        self.value[lit ^ 1] = -1
+        v = lit >> 1
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """Unit propagation of the trail with the watched literals, return a conflicting clause or None."""
+        value = self.value
+        watches = self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+            watchers = watches[false_lit]
+            kept = []
+            for i, clause in enumerate(watchers):
+                # the false literal is kept at position 1
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                if value[first] == 1:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if value[lit] != -1:
+                        clause[1], clause[k] = lit, false_lit
+                        watches[lit].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value[first] == -1:
+                        kept.extend(watchers[i + 1:])
+                        watches[false_lit] = kept
+                        self.qhead = len(trail)
+                        return clause
+                    self.enqueue(first, clause)
+            watches[false_lit] = kept
+        return None
+
+    #####################
+    #      Learning     #
+    #####################
+    def analyze(self, conflict):
+        """First-UIP analysis of a conflict, return the learnt clause (asserting literal first) and the backjump level."""
+        seen = self.seen
+        level = self.level
+        reason = self.reason
+        trail = self.trail
+        current = len(self.trail_lim)
+        learnt = [None]
+        counter = 0
+        lit = None
+        index = len(trail) - 1
+        clause = conflict
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                v = q >> 1
+                if not seen[v] and level[v] > 0:
+                    seen[v] = 1
+                    self.bump(v)
+                    if level[v] >= current:
+                        counter += 1
+                    else:
+                        learnt.append(q)
+            while not seen[trail[index] >> 1]:
+                index -= 1
+            lit = trail[index]
+            index -= 1
+            clause = reason[lit >> 1]
+            seen[lit >> 1] = 0
+            counter -= 1
+            if counter == 0:
+                break
+        learnt[0] = lit ^ 1
+        # a literal implied by other literals of the clause (or by level 0) is redundant
+        minimized = [learnt[0]]
+        for q in learnt[1:]:
+            r = reason[q >> 1]
+            if r is None or any(not seen[x >> 1] and level[x >> 1] > 0 for x in r[1:]):
+                minimized.append(q)
+        for q in learnt[1:]:
+            seen[q >> 1] = 0
+        # the literal with the highest level is watched with the asserting one
+        backjump = 0
+        if len(minimized) > 1:
+            best = max(range(1, len(minimized)), key=lambda i: level[minimized[i] >> 1])
+            minimized[1], minimized[best] = minimized[best], minimized[1]
+            backjump = level[minimized[1] >> 1]
+        return minimized, backjump
+
+    def bump(self, v):
+        self.activity[v] += self.var_inc
+        if self.activity[v] > 1e100:
+            for w in range(1, self.n + 1):
+                self.activity[w] *= 1e-100
+            self.var_inc *= 1e-100
+            self.rebuild_heap()
+        else:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def rebuild_heap(self):
+        self.heap = [(-self.activity[v], v) for v in range(1, self.n + 1) if self.value[2 * v] == 0]
+        heapq.heapify(self.heap)
+
+    def cancel_until(self, level):
+        if len(self.trail_lim) <= level:
+            return
+        value = self.value
+        for lit in self.trail[self.trail_lim[level]:]:
+            v = lit >> 1
+            value[lit] = value[lit ^ 1] = 0
+            self.reason[v] = None
+            self.polarity[v] = lit & 1 == 0
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    #####################
+    #      Search       #
+    #####################
+    def pick_branch(self):
+        """Unassigned variable of highest activity as a literal of its saved phase, or None if all are assigned."""
+        heap = self.heap
+        value = self.value
+        activity = self.activity
+        while heap:
+            act, v = heapq.heappop(heap)
+            # entries of assigned variables and outdated activities are skipped
+            if value[2 * v] == 0 and -act == activity[v]:
+                return 2 * v if self.polarity[v] else 2 * v + 1
+        return None
+
+    def reduce_db(self):
+        """At level 0, forget the longest half of the learnt clauses and drop the literals that became false."""
+        self.learnts.sort(key=len)
+        self.learnts = self.learnts[:len(self.learnts) // 2]
+        value = self.value
+        for db in (self.clauses, self.learnts):
+            kept = []
+            for clause in db:
+                if any(value[lit] == 1 for lit in clause):
+                    continue
+                clause[:] = [lit for lit in clause if value[lit] == 0]
+                kept.append(clause)
+            db[:] = kept
+        self.watches = [[] for _ in range(2 * self.n + 2)]
+        for clause in self.clauses + self.learnts:
+            self.watches[clause[0]].append(clause)
+            self.watches[clause[1]].append(clause)
+        if len(self.heap) > 4 * self.n:
+            self.rebuild_heap()
+
+    def search(self, budget):
+        """
+        CDCL loop until budget conflicts, return True (model found), False (unsatisfiable), None (restart) or
+        "assumptions" (unsatisfiable under the assumptions).
+        """
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.trail_lim:
+                    return False
+                learnt, backjump = self.analyze(conflict)
+                self.cancel_until(backjump)
+                if len(learnt) == 1:
+                    self.enqueue(learnt[0], None)
+                else:
+                    self.learnts.append(learnt)
+                    self.watches[learnt[0]].append(learnt)
+                    self.watches[learnt[1]].append(learnt)
+                    self.enqueue(learnt[0], learnt)
+                self.var_inc /= self.var_decay
+            else:
+                if conflicts >= budget:
+                    self.cancel_until(0)
+                    return None
+                lit = None
+                while len(self.trail_lim) < len(self.assumptions):
+                    assumption = self.assumptions[len(self.trail_lim)]
+                    if self.value[assumption] == 1:
+                        # already true: an empty decision level keeps the levels aligned with the assumptions
+                        self.trail_lim.append(len(self.trail))
+                    elif self.value[assumption] == -1:
+                        return "assumptions"
+                    else:
+                        lit = assumption
+                        break
+                if lit is None:
+                    lit = self.pick_branch()
+                if lit is None:
+                    return True
+                self.decisions += 1
+                self.trail_lim.append(len(self.trail))
+                self.enqueue(lit, None)
+
+    def solve(self, assumptions=()):
+        """
+        Return True if the clauses are satisfiable with all the assumptions (DIMACS literals) true, the model is then
+        available with model(), False otherwise.
+        """
+        self.assignment = None
+        if not self.ok:
+            return False
+        self.new_vars(max((abs(x) for x in assumptions), default=0))
+        self.assumptions = [2 * x if x > 0 else -2 * x + 1 for x in assumptions]
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+        self.max_learnts = max(self.max_learnts, len(self.clauses) // 3 + 100)
+        restart = 0
+        while True:
+            status = self.search(luby(restart) * self.restart_base)
+            restart += 1
+            if status is not None:
+                break
+            if len(self.learnts) >= self.max_learnts + len(self.trail):
+                self.reduce_db()
+                self.max_learnts = int(self.max_learnts * 1.1)
+        if status is True:
+            self.assignment = [self.value[2 * v] == 1 for v in range(self.n + 1)]
+        elif status is False:
+            self.ok = False
+        self.cancel_until(0)
+        return status is True
+
+    def model(self):
+        """Variables that are true in the last model found, as in the output of minisat.minisat."""
+        return [v for v in range(1, self.n + 1) if self.assignment[v]]
@@ -13,6 +13,9 @@ clause.add_positive(0, 1)
 clause.add_negative(1, 2)
 clause.add_positive(3, 3)
 
+Auxiliary variables, numbered after the size*size cell variables, are added
+with their DIMACS literal: clause.add_literal(-17) adds ~A_17.
+
 """
 
 
@@ -30,6 +33,8 @@ class Clause:
             raise ValueError("Indices : row_ind =", row_ind, "column_ind =", column_ind, "is incorrect")
 
     def str_from_index(self, index):
+        if abs(index) > self.n_rows * self.n_columns:
+            return '{0}A_{1}'.format('~' if index < 0 else '', abs(index))
         if index >= 0:
             index -= 1
         else:
@@ -47,6 +52,9 @@ class Clause:
         # print("row = ", row_ind, " and col = ", column_ind)
         self.value.append(-self.index(row_ind, column_ind)-1)
 
+    def add_literal(self, literal):
+        self.value.append(literal)
+
     def minisat_str(self):
         return ' '.join([str(x) for x in self.value])
 
@@ -0,0 +1,90 @@
+"""
+Compact storage of CNF clauses and DIMACS serialisation.
+
+A ClauseDB keeps all its clauses in a single array of 32-bit integers, in the
+DIMACS order: the literals of a clause followed by a 0. offsets[i] is the
+position of the first literal of clause i, so that clause i is
+literals[offsets[i]:offsets[i + 1] - 1]. This avoids a Python object per
+clause and lets the DIMACS text be produced for many clauses at once.
+
+>>> db = ClauseDB([(-1, 2), (-2, -3), (1,)])
+>>> len(db), db.n_vars, db[1]
+(3, 3, [-2, -3])
+>>> print(''.join(dimacs_chunks(db.n_vars, db)), end='')
+p cnf 3 3
+-1 2 0
+-2 -3 0
+1 0
+"""
+
+from array import array
+
+
+def literals(clause):
+    """Clause as a sequence of integers, clauses may also be given as strings (see Clause.minisat_str)."""
+    if isinstance(clause, str):
+        return [int(x) for x in clause.split()]
+    return clause
+
+
+class ClauseDB:
+
+    def __init__(self, clauses=(), n_vars=0):
+        self.literals = array('i')
+        self.offsets = array('q', [0])
+        self.n_vars = n_vars
+        self.extend(clauses)
+
+    def add(self, clause):
+        self.extend([clause])
+
+    def extend(self, clauses):
+        lits = self.literals
+        offsets = self.offsets
+        start = len(lits)
+        for clause in clauses:
+            if isinstance(clause, str):
+                clause = literals(clause)
+            lits.extend(clause)
+            lits.append(0)
+            offsets.append(len(lits))
+        if len(lits) > start:
+            # the variables are counted once for all the new literals
+            self.n_vars = max(self.n_vars, max(lits[start:]), -min(lits[start:]))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.literals[self.offsets[i]:self.offsets[i + 1] - 1].tolist()
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def dimacs(self, start=0, stop=None):
+        """DIMACS lines of the clauses start..stop-1, converted in a single pass."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return ''
+        text = ' '.join(map(str, self.literals[self.offsets[start]:self.offsets[stop]]))
+        # a literal is never 0, so ' 0 ' only matches the ends of the clauses
+        return text.replace(' 0 ', ' 0\n') + '\n'
+
+
+def dimacs_chunks(n, clauses, chunk=4096):
+    """
+    Generator of the DIMACS text of the clauses over n variables, by pieces
+    of chunk clauses. Clauses that are not a ClauseDB are first stored in one.
+    """
+    if not isinstance(clauses, ClauseDB):
+        clauses = ClauseDB(clauses)
+    yield 'p cnf %d %d\n' % (n, len(clauses))
+    for start in range(0, len(clauses), chunk):
+        yield clauses.dimacs(start, start + chunk)
+
+
+def write_dimacs(file, n, clauses, chunk=4096):
+    """Write the DIMACS text of the clauses over n variables to the text file file."""
+    for text in dimacs_chunks(n, clauses, chunk):
+        file.write(text)
@@ -0,0 +1,240 @@
+"""
+Min-conflicts local search for the N-queens problem, for boards too large for
+the SAT encoding of queen_solver.py.
+
+A state has one queen per row, and keeps for every column, descending and
+ascending diagonal the number of queens on it, so that the number of queens
+attacking a cell is known in O(1) and a whole row is scored with a few NumPy
+operations. The pre-placed queens are fixed: their rows never move.
+
+The search runs on the local search framework of the vertexcover directory
+(Problem, LSNode, random_successor and value), see load_search.
+"""
+
+import importlib.util
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+# boards from this size on are solved by local search by default in the solve scripts
+LOCAL_SEARCH_SIZE = 200
+
+SEARCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'vertexcover', 'vertexcover_student')
+
+
+def load_search(directory=SEARCH_DIR):
+    """
+    The search.py module of the local search framework, the single supported way to use it from this directory. It is
+    loaded from its file as the module vertexcover_search, so that it neither shadows nor is shadowed by another module
+    named search; its directory is only on the path while it imports its utils.py.
+    """
+    if "vertexcover_search" in sys.modules:
+        return sys.modules["vertexcover_search"]
+    spec = importlib.util.spec_from_file_location("vertexcover_search", os.path.join(directory, "search.py"))
+    if spec is None:
+        raise ImportError("no local search framework in " + directory)
+    module = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, directory)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        sys.path.remove(directory)
+    sys.modules[spec.name] = module
+    return module
+
+
+search = load_search()
+LSNode, Problem = search.LSNode, search.Problem
+local_search_done, local_search_result = search.local_search_done, search.local_search_result
+
+
+def conflicting(size, queens):
+    """
+    True if the pre-placed queens (a list of (row, column)) make the board unsolvable: a queen off the board, or two
+    distinct queens on the same row, column or diagonal.
+    """
+    cells = set(queens)
+    if any(not (0 <= r < size and 0 <= c < size) for r, c in cells):
+        return True
+    return any(len({key(r, c) for r, c in cells}) < len(cells)
+               for key in (lambda r, c: r, lambda r, c: c, lambda r, c: r - c, lambda r, c: r + c))
+
+
+class State:
+
+    def __init__(self, size, cols, fixed):
+        # cols[r] is the column of the queen of row r, fixed[r] is True if that queen was pre-placed
+        self.size = size
+        self.cols = np.asarray(cols, dtype=np.int64)
+        self.fixed = np.asarray(fixed, dtype=bool)
+        self.rows = np.arange(size)
+        self.column = np.bincount(self.cols, minlength=size)
+        self.descending = np.bincount(self.rows - self.cols + size - 1, minlength=2 * size - 1)
+        self.ascending = np.bincount(self.rows + self.cols, minlength=2 * size - 1)
+        # number of pairs of queens attacking each other
+        self.attacks = int(sum((line * (line - 1) // 2).sum() for line in (self.column, self.descending, self.ascending)))
+
+    def attacking(self, r, c):
+        """Number of queens of the other rows attacking cell (r, c)."""
+        own = 3 if self.cols[r] == c else 0
+        return int(self.column[c] + self.descending[r - c + self.size - 1] + self.ascending[r + c]) - own
+
+    def row_conflicts(self):
+        """For every row, the number of queens attacking its queen."""
+        return self.column[self.cols] + self.descending[self.rows - self.cols + self.size - 1] + \
+            self.ascending[self.rows + self.cols] - 3
+
+    def column_conflicts(self, r):
+        """For every column c, the number of queens of the other rows attacking cell (r, c)."""
+        cs = self.rows
+        conflicts = self.column + self.descending[r - cs + self.size - 1] + self.ascending[r + cs]
+        conflicts[self.cols[r]] -= 3
+        return conflicts
+
+    def move(self, r, c):
+        """Move the queen of row r to column c, in place."""
+        old = self.cols[r]
+        n = self.size - 1
+        self.attacks -= self.attacking(r, old)
+        self.column[old] -= 1
+        self.descending[r - old + n] -= 1
+        self.ascending[r + old] -= 1
+        self.cols[r] = c
+        self.column[c] += 1
+        self.descending[r - c + n] += 1
+        self.ascending[r + c] += 1
+        self.attacks += self.attacking(r, c)
+
+    def copy(self):
+        state = State.__new__(State)
+        state.__dict__.update(self.__dict__)
+        for name in ("cols", "column", "descending", "ascending"):
+            setattr(state, name, getattr(self, name).copy())
+        return state
+
+    def true_variables(self):
+        """The cells with a queen as variables of the SAT encoding (see Clause), as returned by minisat.minisat."""
+        return (self.rows * self.size + self.cols + 1).tolist()
+
+    def __str__(self):
+        return ' '.join(str(c) for c in self.cols)
+
+
+class NQueens(Problem):
+
+    def __init__(self, size, queens=None, candidates=8):
+        """
+        The initial state respects the pre-placed queens (a list of (row, column)) and places the other queens row by row
+        on distinct columns, on the first of candidates random free columns that is not attacked diagonally. Raises a
+        ValueError if the pre-placed queens are conflicting.
+        """
+        if conflicting(size, queens or []):
+            raise ValueError("the pre-placed queens attack each other")
+        fixed = np.zeros(size, dtype=bool)
+        cols = np.zeros(size, dtype=np.int64)
+        for r, c in queens or []:
+            fixed[r] = True
+            cols[r] = c
+        taken = set(cols[fixed].tolist())
+        free = [c for c in range(size) if c not in taken]
+        random.shuffle(free)
+        descending = np.zeros(2 * size - 1, dtype=np.int64)
+        ascending = np.zeros(2 * size - 1, dtype=np.int64)
+        for r in np.flatnonzero(fixed):
+            descending[r - cols[r] + size - 1] += 1
+            ascending[r + cols[r]] += 1
+        for r in np.flatnonzero(~fixed):
+            # free is consumed from its end, a column without diagonal conflict is swapped there first
+            for k in range(min(candidates, len(free))):
+                i = random.randrange(len(free))
+                if descending[r - free[i] + size - 1] == 0 and ascending[r + free[i]] == 0:
+                    free[i], free[-1] = free[-1], free[i]
+                    break
+            cols[r] = free.pop() if free else random.randrange(size)
+            descending[r - cols[r] + size - 1] += 1
+            ascending[r + cols[r]] += 1
+        super().__init__(State(size, cols, fixed))
+
+    def successor(self, state):
+        # every move of the queen of a random conflicting row, copying the state: only for small boards
+        conflicted = np.flatnonzero((state.row_conflicts() > 0) & ~state.fixed)
+        if len(conflicted) == 0:
+            return []
+        r = int(random.choice(conflicted))
+        successors = []
+        for c in range(state.size):
+            if c != state.cols[r]:
+                next = state.copy()
+                next.move(r, c)
+                successors.append(((r, c), next))
+        return successors
+
+    def random_successor(self, state):
+        free = np.flatnonzero(~state.fixed)
+        if len(free) == 0:
+            # every queen is pre-placed: the state is its own only neighbour
+            return None, state
+        r = int(random.choice(free))
+        c = random.randrange(state.size)
+        next = state.copy()
+        next.move(r, c)
+        return (r, c), next
+
+    def goal_test(self, state):
+        return state.attacks == 0
+
+    def value(self, state):
+        return -state.attacks
+
+
+def min_conflicts(problem, limit=100000, callback=None, time_limit=None, noise=0.1):
+    """
+    Min-conflicts search: at each step, the queen of a random attacked row (that is not fixed) moves to another column of
+    its row attacked by the fewest queens, ties being broken at random, or with probability noise to a random column, which
+    gets small boards out of their local minima. The state is updated in place, so the returned LSNode is the last one,
+    which is a solution when problem.goal_test holds (it then has n_nodes and elapsed, see local_search_result).
+    """
+    start = time.perf_counter()
+    state = problem.initial.copy()
+    current = LSNode(problem, state, 0)
+    for step in range(limit):
+        if local_search_done(problem, current, start, time_limit):
+            break
+        if callback is not None:
+            callback(current)
+        conflicted = np.flatnonzero((state.row_conflicts() > 0) & ~state.fixed)
+        if len(conflicted) == 0:
+            # only fixed queens attack each other
+            break
+        r = int(random.choice(conflicted))
+        if random.random() < noise:
+            c = random.randrange(state.size)
+        else:
+            conflicts = state.column_conflicts(r)
+            conflicts[state.cols[r]] = 3 * state.size
+            c = int(random.choice(np.flatnonzero(conflicts == conflicts.min())))
+        state.move(r, c)
+        current = LSNode(problem, state, step + 1)
+    return local_search_result(current, current.step + 1, start)
+
+
+def solve(size, queens=None, limit=100000, time_limit=None):
+    """
+    Solution of the size-queens problem with the pre-placed queens as minisat.minisat would return it, or None if none was
+    found within limit steps (which does not mean that there is none, see conflicting).
+    """
+    problem = NQueens(size, queens)
+    node = min_conflicts(problem, limit, time_limit=time_limit)
+    return node.state.true_variables() if problem.goal_test(node.state) else None
+
+
+if __name__ == '__main__':
+    for size in (8, 100, 1000, 10000):
+        start = time.perf_counter()
+        problem = NQueens(size)
+        node = min_conflicts(problem)
+        print("n={0}\tT={1:.2f}\tS={2}\tsolved={3}".format(size, time.perf_counter() - start, node.step,
+                                                          problem.goal_test(node.state)))
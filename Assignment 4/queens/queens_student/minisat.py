@@ -1,7 +1,13 @@
 """Helper module to call minisat."""
 
 import os
+import subprocess
+import sys
 import tempfile
+import time
+
+from cdcl import Solver
+from clausedb import ClauseDB, dimacs_chunks, literals
 
 """Run Minisat on the given set of clauses. Return None if the clauses are
 unsatisfiable, or a solution that satisfies all the clauses (a sequence of
@@ -27,25 +33,216 @@ model."""
 
 
 def minisat(n, clauses, executable="./minisatLinux"):
-    clause_path = './tmp/clauses.tmp'
-    sol_path = './tmp/sol.tmp'
-    out_path = './tmp/minisat.out'
-    try:
-        # Creating and writing the clause file
-        clause_file = open(clause_path, 'wt')
-        print('p cnf', n, len(clauses), file=clause_file)
-        for c in clauses:
-            print(c, '0', file=clause_file)
-        clause_file.close()
-        # Reading the sol file
-        os.system('%s %s %s > %s' % (executable, clause_path, sol_path, out_path))
-        out_file = open(sol_path)
-        if out_file.readline().strip() == 'UNSAT':
-            return None
-        else:
-            return [int(x) for x in out_file.readline().strip().split(' ') if int(x) > 0]
-    finally:
+    return MinisatBackend(executable).solve(n, clauses)
+
+
+def dimacs_body(clauses):
+    """DIMACS lines of the clauses, without the header."""
+    if not isinstance(clauses, ClauseDB):
+        clauses = ClauseDB(clauses)
+    return clauses.dimacs()
+
+
+class Backend:
+    """
+    A SAT solver. solve(n, clauses) returns None if the clauses are
+    unsatisfiable, or the list of the variables that are true in a model, as
+    the minisat function.
+    """
+
+    name = None
+
+    def solve(self, n, clauses):
+        raise NotImplementedError
+
+    def session(self, n, clauses):
+        """Session to solve the clauses under many sets of assumptions."""
+        return Session(self, n, clauses)
+
+
+class Session:
+    """
+    Incremental solving: the clauses are loaded once, then solve(assumptions)
+    can be called many times, the assumptions being literals that must be true
+    for that query only. It returns None or the true variables, as
+    Backend.solve. This generic session solves the clauses with the
+    assumptions as unit clauses.
+    """
+
+    def __init__(self, backend, n, clauses):
+        self.backend = backend
+        self.n = n
+        self.clauses = [literals(c) for c in clauses]
+
+    def add_clause(self, clause):
+        self.clauses.append(literals(clause))
+
+    def solve(self, assumptions=()):
+        return self.backend.solve(self.n, self.clauses + [[x] for x in assumptions])
+
+
+class MinisatError(Exception):
+    """Raised when the MiniSat executable cannot be run or fails."""
+
+
+class MinisatBackend(Backend):
+    """
+    The MiniSat executable. The clauses are streamed through a pipe and the
+    model is read from a temporary file of a unique name, so that several
+    solves can run at the same time. The answer is given by the exit status
+    of MiniSat (10 if satisfiable, 20 if unsatisfiable), any other status
+    raises a MinisatError.
+    """
+
+    SAT = 10
+    UNSAT = 20
+    # exit status of MiniSat when the DIMACS input cannot be parsed
+    PARSE_ERROR = 3
+
+    name = "minisat"
+
+    def __init__(self, executable="./minisatLinux"):
+        self.executable = executable
+
+    def solve(self, n, clauses):
+        return self.solve_dimacs(dimacs_chunks(n, clauses))
+
+    def solve_dimacs(self, chunks):
+        """Run MiniSat on the DIMACS text given as a sequence of strings."""
+        fd, sol_path = tempfile.mkstemp(prefix='sol', suffix='.tmp')
+        os.close(fd)
         try:
-            out_file.close()
-        except:
-            pass
+            try:
+                process = subprocess.Popen([self.executable, '/dev/stdin', sol_path], stdin=subprocess.PIPE,
+                                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            except OSError as error:
+                raise MinisatError("cannot run {0}: {1}".format(self.executable, error)) from error
+            try:
+                with process.stdin:
+                    for text in chunks:
+                        process.stdin.write(text.encode())
+            except BrokenPipeError:
+                # MiniSat stopped reading its input, its exit status tells why
+                pass
+            error = process.stderr.read().decode(errors='replace').strip()
+            process.stderr.close()
+            status = process.wait()
+            if status == self.UNSAT:
+                return None
+            if status != self.SAT:
+                reason = "parse error in the DIMACS input" if status == self.PARSE_ERROR else "exit status %d" % status
+                raise MinisatError("{0} failed ({1}){2}".format(self.executable, reason, ": " + error if error else ""))
+            with open(sol_path) as out_file:
+                if out_file.readline().strip() != 'SAT':
+                    raise MinisatError("{0} answered SAT without writing a model".format(self.executable))
+                return [int(x) for x in out_file.readline().split() if int(x) > 0]
+        finally:
+            os.remove(sol_path)
+
+    def session(self, n, clauses):
+        return MinisatSession(self, n, clauses)
+
+
+class MinisatSession(Session):
+    """
+    Session of the MiniSat executable, which cannot keep its state between
+    runs: the DIMACS text of the clauses is built once and every query only
+    appends its assumptions to it. The added clauses are kept as a list of
+    pieces of text, joined at the next query.
+    """
+
+    def __init__(self, backend, n, clauses):
+        self.backend = backend
+        self.n = n
+        self.n_clauses = len(clauses)
+        self.body = [dimacs_body(clauses)]
+
+    def add_clause(self, clause):
+        self.n_clauses += 1
+        self.body.append(dimacs_body([clause]))
+
+    def solve(self, assumptions=()):
+        if len(self.body) > 1:
+            self.body = [''.join(self.body)]
+        header = 'p cnf %d %d\n' % (self.n, self.n_clauses + len(assumptions))
+        return self.backend.solve_dimacs([header, self.body[0], dimacs_body([x] for x in assumptions)])
+
+
+class PythonBackend(Backend):
+    """The CDCL solver of cdcl.py, run in the current process."""
+
+    name = "python"
+
+    def __init__(self, **options):
+        # options of cdcl.Solver, e.g. restart_base or var_decay
+        self.options = options
+        self.solver = None
+
+    def solve(self, n, clauses):
+        self.solver = Solver(n, **self.options)
+        if not self.solver.add_clauses(literals(c) for c in clauses) or not self.solver.solve():
+            return None
+        return self.solver.model()
+
+    def session(self, n, clauses):
+        return IncrementalSession(self, n, clauses)
+
+
+class IncrementalSession(Session):
+    """
+    Session of the CDCL solver: a single solver holds the clauses, and the
+    clauses it learns while answering a query speed up the next ones.
+    """
+
+    def __init__(self, backend, n, clauses):
+        self.solver = Solver(n, **backend.options)
+        self.solver.add_clauses(literals(c) for c in clauses)
+
+    def add_clause(self, clause):
+        self.solver.add_clause(literals(clause))
+
+    def solve(self, assumptions=()):
+        if not self.solver.solve(assumptions):
+            return None
+        return self.solver.model()
+
+
+def default_executable():
+    return "./minisatMac" if sys.platform == "darwin" else "./minisatLinux"
+
+
+def get_backend(name, executable=None):
+    """Backend of the given name ("minisat" or "python")."""
+    if name == MinisatBackend.name:
+        return MinisatBackend(executable or default_executable())
+    if name == PythonBackend.name:
+        return PythonBackend()
+    raise ValueError("unknown SAT backend: " + str(name))
+
+
+def benchmark(sizes, backends, encode):
+    """
+    Solve the board of every size of sizes with every backend, in this process.
+    encode(size) must return the number of variables and the clauses.
+    Returns a list of (backend name, size, time, satisfiable).
+    """
+    results = []
+    for size in sizes:
+        n, clauses = encode(size)
+        for backend in backends:
+            start = time.perf_counter()
+            solution = backend.solve(n, clauses)
+            results.append((backend.name, size, time.perf_counter() - start, solution is not None))
+    return results
+
+
+if __name__ == '__main__':
+    from queen_solver import clause_db
+
+    def encode(size):
+        db = clause_db(size)
+        return db.n_vars, db
+
+    backends = [get_backend(name) for name in (sys.argv[1:] or ["python", "minisat"])]
+    for name, size, elapsed, sat in benchmark([8, 16, 24, 32], backends, encode):
+        print("{0}\tn={1}\tT={2:.3f}\t{3}".format(name, size, elapsed, "SAT" if sat else "UNSAT"))
@@ -1,4 +1,8 @@
 from clause import *
+from clausedb import ClauseDB
+import math
+import time
+import validator
 
 """
 For the queen problem, the only code you have to do is in this file.
@@ -16,90 +20,212 @@ Read the comment on top of clause.py to see how this works.
 """
 
 
-def get_expression(size, queens=None):
+ENCODINGS = ("pairwise", "sequential", "commander", "product")
+
+
+def lines(size):
+    """Rows, columns, descending and ascending diagonals of the board, as lists of cells, if they have 2 cells or more."""
+    rows = [[(i, j) for j in range(size)] for i in range(size)]
+    columns = [[(i, j) for i in range(size)] for j in range(size)]
+    descending = [[(i, i - d) for i in range(size) if 0 <= i - d < size] for d in range(-size + 2, size - 1)]
+    ascending = [[(i, s - i) for i in range(size) if 0 <= s - i < size] for s in range(1, 2 * size - 2)]
+    return rows + columns + descending + ascending
+
+
+class Encoder:
+    """
+    Generates the clauses of the expression, as tuples of DIMACS literals. Cell (i, j) is the variable i*size+j+1 (see
+    Clause), the auxiliary variables of the at-most-one encodings are numbered after them.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.n_vars = size * size
+
+    def variable(self, cell):
+        return cell[0] * self.size + cell[1] + 1
+
+    def new_variable(self):
+        self.n_vars += 1
+        return self.n_vars
+
+    def at_most_one(self, xs, encoding):
+        return getattr(self, encoding)(xs)
+
+    def pairwise(self, xs):
+        # n(n-1)/2 clauses, no auxiliary variable
+        for a in range(len(xs) - 1):
+            for b in range(a + 1, len(xs)):
+                yield -xs[a], -xs[b]
+
+    def sequential(self, xs):
+        # Sinz's sequential counter: s_i is true if one of x_1..x_i is, 3n-4 clauses and n-1 auxiliary variables
+        if len(xs) <= 2:
+            yield from self.pairwise(xs)
+            return
+        s = [self.new_variable() for _ in range(len(xs) - 1)]
+        yield -xs[0], s[0]
+        for i in range(1, len(xs) - 1):
+            yield -xs[i], s[i]
+            yield -s[i - 1], s[i]
+            yield -xs[i], -s[i - 1]
+        yield -xs[-1], -s[-1]
+
+    def commander(self, xs, group=3):
+        # each group of variables has a commander implied by its variables, at most one commander can be true
+        if len(xs) <= group + 1:
+            yield from self.pairwise(xs)
+            return
+        commanders = []
+        for g in range(0, len(xs), group):
+            members = xs[g:g + group]
+            yield from self.pairwise(members)
+            c = self.new_variable()
+            for x in members:
+                yield -x, c
+            commanders.append(c)
+        yield from self.commander(commanders, group)
+
+    def product(self, xs):
+        # Chen's 2-product: x_k placed on a p x q grid implies its row u_i and column v_j, each being at most one
+        if len(xs) <= 4:
+            yield from self.pairwise(xs)
+            return
+        p = math.ceil(math.sqrt(len(xs)))
+        q = math.ceil(len(xs) / p)
+        u = [self.new_variable() for _ in range(p)]
+        v = [self.new_variable() for _ in range(q)]
+        for k, x in enumerate(xs):
+            yield -x, u[k // q]
+            yield -x, v[k % q]
+        yield from self.product(u)
+        yield from self.product(v)
+
+    def lex_leader(self, permutation):
+        # X <=lex sigma(X) on the cells in row-major order, where sigma(X)[c] = X[permutation[c]]; e is true while the
+        # prefixes of X and sigma(X) are equal (None standing for true), it only has to be implied by the equality
+        e = None
+        for c, d in enumerate(permutation):
+            if c == d:
+                continue
+            x, y = c + 1, d + 1
+            prefix = () if e is None else (-e,)
+            yield prefix + (-x, y)
+            e = self.new_variable()
+            yield prefix + (-x, -y, e)
+            yield prefix + (x, y, e)
+
+
+def symmetries(size):
+    """The 8 symmetries of the board (rotations and reflections) as functions of a cell, the identity first."""
+    m = size - 1
+    return [lambda i, j: (i, j), lambda i, j: (j, m - i), lambda i, j: (m - i, m - j), lambda i, j: (m - j, i),
+            lambda i, j: (m - i, j), lambda i, j: (i, m - j), lambda i, j: (j, i), lambda i, j: (m - j, m - i)]
+
+
+def stabilizer(size, queens=None):
+    """Symmetries of the board that keep the pre-placed queens in place, the identity first."""
+    placed = set(queens or [])
+    return [sym for sym in symmetries(size) if {sym(i, j) for i, j in placed} == placed]
+
+
+def generate_clauses(size, queens=None, encoding="sequential", symmetry=False):
+    """
+    Generator of the clauses of the size-queens problem, as tuples of DIMACS literals: a queen on every row, and at most
+    one queen on every row, column and diagonal with the at-most-one encoding of ENCODINGS. The pre-placed queens, a list
+    of (row, column), are unit clauses; to solve many placements on the same board, leave them out and pass
+    placement(size, queens) as assumptions to a session.
+    If symmetry is True, lex-leader clauses keep only the smallest solution (as a sequence of cells) of every class of
+    solutions equivalent by a symmetry that keeps the queens in place.
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError("unknown encoding: " + str(encoding))
+    encoder = Encoder(size)
+    for i in range(size):
+        yield tuple(encoder.variable((i, j)) for j in range(size))
+    for line in lines(size):
+        yield from encoder.at_most_one([encoder.variable(cell) for cell in line], encoding)
+    for literal in placement(size, queens or []):
+        yield literal,
+    if symmetry:
+        for sym in stabilizer(size, queens)[1:]:
+            yield from encoder.lex_leader([i * size + j for i, j in (sym(c // size, c % size) for c in range(size * size))])
+
+
+def get_expression(size, queens=None, encoding="sequential", symmetry=False):
+    """The clauses of generate_clauses as Clause objects."""
     expression = []
-
-    # 1.1 Clauses for rows (1QUEEN MIN)
-    for i in range(size): #row index
-        for j in range(size-1): #column index_1
-            for k in range(j+1,size): #column_index_2
-                clause = Clause(size)
-                clause.add_negative(i,j)
-                clause.add_negative(i,k)
-                expression.append(clause)
-
-    # 1.2 Clauses for rows (1QUEEN MAX)
-    for i in range(size): #row index
-        for j in range(size-1): #column index_1
-            for k in range(j+1,size): #column_index_2
-                clause = Clause(size)
-                clause.add_negative(i,j)
-                clause.add_negative(i,k)
-                expression.append(clause)
-
-    # 2.1 Clauses for columns (1QUEEN MIN)
-    for i in range(size): #column index
-        for j in range(size-1): #row index_1
-            for k in range(j+1,size): #row index_2
-                clause = Clause(size)
-                clause.add_negative(j,i)
-                clause.add_negative(k,i)
-                expression.append(clause)
-
-    # 2.2 Clauses for columns (1QUEEN MAX)
-    for i in range(size): #column index
-        for j in range(size-1): #row index_1
-            for k in range(j+1,size): #row index_2
-                clause = Clause(size)
-                clause.add_negative(j,i)
-                clause.add_negative(k,i)
-                expression.append(clause)
-
-    # 3 Clauses for descending diago
-    # 3.1 middle and board above
-    for i in range(size-1): #index of diago
-        for j in range (size-i-1): # number of cases of the diago -1
-            for k in range(1,size-i-j):
-                clause = Clause(size)
-                clause.add_negative(j,j+i)
-                clause.add_negative(j+k,j+k+i)
-                expression.append(clause)
-
-    # 3.2 board below
-    for i in range(1,size-1): #index of diago
-        for j in range (size-i-1): # number of cases of the diago -1
-            for k in range(1,size-i-j):
-                clause = Clause(size)
-                clause.add_negative(j+i,j)
-                clause.add_negative(j+i+k,j+k)
-                expression.append(clause)
-
-    # 4 Clauses for ascending diago
-    # 4.1 middle and board above
-    for i in range(size-1): #index of diago
-        for j in range (size-i-1): # number of cases of the diago -1
-            for k in range(1,size-j-i):
-                clause = Clause(size)
-                clause.add_negative(size-(j+i)-1,j)
-                clause.add_negative(size-(j+i+k)-1,j+k)
-                expression.append(clause)
-
-    # 4.2 board below
-    for i in range(1,size-1): #index of diago
-        for j in range (size-i-1): # number of cases of the diago -1
-            for k in range(1,size-i-j):
-                clause = Clause(size)
-                clause.add_negative(size-j-1,j+i)
-                clause.add_negative(size-(j+k)-1,j+k+i)
-                expression.append(clause)
-
-        
-    # your code here
+    for literals in generate_clauses(size, queens, encoding, symmetry):
+        clause = Clause(size)
+        for literal in literals:
+            clause.add_literal(literal)
+        expression.append(clause)
 
     return expression
 
 
+def clause_db(size, queens=None, encoding="sequential", symmetry=False):
+    """The clauses of generate_clauses stored in a ClauseDB, whose n_vars counts the cells and auxiliary variables."""
+    return ClauseDB(generate_clauses(size, queens, encoding, symmetry), n_vars=size * size)
+
+
+def all_solutions(size, queens=None, backend=None, symmetry=True, encoding="sequential"):
+    """
+    Generator of all the solutions of the size-queens problem with the pre-placed queens, each one being a sorted list of
+    (row, column), found with an incremental session of backend (the CDCL solver by default): after each solution, a
+    clause forbidding it is added. If symmetry is True, only the representative of every class of symmetric solutions is
+    generated (see generate_clauses), with the number of solutions of its class: the pairs (solution, class size) are
+    generated in both cases, the size being 1 without symmetry breaking.
+    """
+    import minisat
+    backend = backend or minisat.PythonBackend()
+    clauses = clause_db(size, queens, encoding, symmetry)
+    session = backend.session(clauses.n_vars, clauses)
+    group = stabilizer(size, queens) if symmetry else symmetries(size)[:1]
+    while True:
+        model = session.solve()
+        if model is None:
+            return
+        cells = [x for x in model if x <= size * size]
+        solution = sorted(((x - 1) // size, (x - 1) % size) for x in cells)
+        images = {tuple(sorted(sym(i, j) for i, j in solution)) for sym in group}
+        yield solution, len(images)
+        session.add_clause([-x for x in cells])
+
+
+def count_solutions(size, queens=None, backend=None, symmetry=True, encoding="sequential", check=False):
+    """
+    Returns the number of solutions, the number of classes of symmetric solutions and the time taken to enumerate them. If
+    check is True, every solution is verified with the validator and a ValueError is raised for a wrong one.
+    """
+    start = time.perf_counter()
+    total = classes = 0
+    for solution, n in all_solutions(size, queens, backend, symmetry, encoding):
+        if check:
+            messages = validator.failures(size, placement(size, solution), queens or [])
+            if messages:
+                raise ValueError("wrong solution {0}: {1}".format(solution, ' '.join(messages)))
+        total += n
+        classes += 1
+    return total, classes, time.perf_counter() - start
+
+
+def placement(size, queens):
+    """Literals stating that there is a queen on every (row, column) of queens."""
+    return [row * size + column + 1 for row, column in queens]
+
+
+def n_variables(size, expression):
+    """Number of variables of the expression, cells and auxiliary variables."""
+    return max([size * size] + [abs(x) for clause in expression for x in clause.value])
+
+
 if __name__ == '__main__':
     expression = get_expression(4)
     for clause in expression:
         print(clause)
+    for size in (8, 50, 200):
+        for encoding in ENCODINGS:
+            expression = get_expression(size, encoding=encoding)
+            print("n={0}\t{1}\tvariables={2}\tclauses={3}".format(size, encoding, n_variables(size, expression),
+                                                                 len(expression)))
@@ -1,42 +1,17 @@
 #!/usr/bin/env python3
 import sys
-from queen_solver import get_expression
+from queen_solver import clause_db, count_solutions, placement
 import minisat
+import minconflicts
+import validator
 
 
 def default_usage():
     # The argument must reference an instance file and the second
-    print("Usage:", sys.argv[0], "INSTANCE_FILE", file=sys.stderr)
+    print("Usage:", sys.argv[0], "INSTANCE_FILE [minisat|python|local] [--all]", file=sys.stderr)
     exit(1)
 
 
-def get_row(grid, i):
-    return grid[i]
-
-
-def get_column(grid, j):
-    out = []
-    for i in range(len(grid)):
-        out.append(grid[i][j])
-    return out
-
-
-def get_left_diag(grid, i, j):
-    out = []
-    for add in range(-len(grid), len(grid)):
-        if i+add >= 0 and i + add < len(grid) and j+add >= 0 and j+add < len(grid):
-            out.append(grid[i+add][j+add])
-    return out
-
-
-def get_right_diag(grid, i, j):
-    out = []
-    for add in range(-len(grid), len(grid)):
-        if i + add >= 0 and i + add < len(grid) and j - add >= 0 and j - add < len(grid):
-            out.append(grid[i + add][j - add])
-    return out
-
-
 def read_instance(instance_file):
     file = open(instance_file)
     size = int(file.readline().split(' ')[0])
@@ -49,51 +24,43 @@ def read_instance(instance_file):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
+    args = [arg for arg in sys.argv[1:] if arg != "--all"]
+    if len(args) not in (1, 2):
         default_usage()
-
-    size, queens = read_instance(sys.argv[1])
-    n_rows = n_columns = size
-    expression = get_expression(size, queens)
-    nb_vars = n_rows * n_columns
-    solution = minisat.minisat(nb_vars, [clause.minisat_str() for clause in expression], './MinisatMac')
+    size, queens = read_instance(args[0])
+    # large boards go to the min-conflicts local search, whose CNF would be too large
+    default = "local" if size >= minconflicts.LOCAL_SEARCH_SIZE else "minisat"
+    backend = args[1] if len(args) == 2 else default
+    if "--all" in sys.argv:
+        if backend == "local":
+            default_usage()
+        # enumeration of all the solutions, one per class of symmetric solutions
+        total, classes, elapsed = count_solutions(size, queens, minisat.get_backend(backend), check=True)
+        print("{0} solutions ({1} up to symmetry) in {2:.2f}s, {3:.1f} solutions/s".format(
+            total, classes, elapsed, total / elapsed if elapsed > 0 else 0))
+        exit(0)
+    if backend == "local":
+        if minconflicts.conflicting(size, queens):
+            print("The problem is unfeasible")
+            exit(0)
+        solution = minconflicts.solve(size, queens)
+        if solution is None:
+            # the local search gave up, which does not prove that there is no solution
+            print("No solution found within the step limit")
+            exit(0)
+    else:
+        # the base CNF does not depend on the instance, the pre-placed queens are assumptions
+        clauses = clause_db(size)
+        session = minisat.get_backend(backend).session(clauses.n_vars, clauses)
+        solution = session.solve(placement(size, queens))
 
     if solution is None:
         print("The problem is unfeasible")
         exit(0)
-    grid = [[0 for _ in range(size)] for _ in range(size)]
-    for s in solution:
-        grid[(s-1)//size][(s-1)%size] = 1
-
-    clean = True
-    n_queens = sum([sum(row) for row in grid])
-    if n_queens != size:
-        clean = False
-        print("FAIL. There are {0} queens on the chess.".format(n_queens))
-    for i in range(len(grid)):
-        if sum(get_row(grid, i)) > 1:
-            clean = False
-            print("FAIL. There is more than 1 queen on row {0}.".format(i))
-        if sum(get_column(grid, i)) > 1:
-            clean = False
-            print("FAIL. There is more than 1 queen on column {0}.".format(i))
-        if sum(get_left_diag(grid, i, 0)) > 1:
-            clean = False
-            print("FAIL. There is more than 1 queen on the left diagonal passing through cell ({0},0).".format(i))
-        if sum(get_left_diag(grid, 0, i)) > 1:
-            clean = False
-            print("FAIL. There is more than 1 queen on the left diagonal passing through cell (0,{0}).".format(i))
-        if sum(get_right_diag(grid, 0, i)) > 1:
-            clean = False
-            print("FAIL. There is more than 1 queen on the right diagonal passing through cell (0,{0}).".format(i))
-        if sum(get_right_diag(grid, size-1-i, size-1)) > 1:
-            clean = False
-            print("FAIL. There is more than 1 queen on the right diagonal passing through cell ({0},{1}).".format(size-1-i,size-1))
-    for queen in queens:
-        if grid[queen[0]][queen[1]] != 1:
-            clean = False
-            print("FAIL. There is no queen in cell ({0},{1}) as required".format(queen[0], queen[1]))
-    if clean:
+    messages = validator.failures(size, solution, queens)
+    for message in messages:
+        print(message)
+    if not messages:
         print("SOLVED")
-        for row in grid:
+        for row in validator.grid_rows(size, solution):
             print(row)
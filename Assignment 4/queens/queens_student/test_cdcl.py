@@ -0,0 +1,104 @@
+"""Tests of the CDCL solver of cdcl.py: run with python -m unittest (or pytest) from this directory."""
+import itertools
+import random
+import unittest
+
+from cdcl import Solver, luby
+
+
+def random_cnf(rng, n, n_clauses, max_len=3):
+    return [[rng.choice((-1, 1)) * rng.randint(1, n) for _ in range(rng.randint(1, max_len))] for _ in range(n_clauses)]
+
+
+def brute_force(n, clauses):
+    """True if some assignment of the variables 1..n satisfies every clause."""
+    for values in itertools.product((False, True), repeat=n):
+        if all(any(values[abs(x) - 1] == (x > 0) for x in clause) for clause in clauses):
+            return True
+    return False
+
+
+def satisfies(model, clauses):
+    true = set(model)
+    return all(any((x in true) if x > 0 else (-x not in true) for x in clause) for clause in clauses)
+
+
+def pigeonhole(pigeons, holes):
+    """Clauses putting every pigeon in a hole, with at most one pigeon per hole: unsatisfiable if pigeons > holes."""
+    def var(i, j):
+        return i * holes + j + 1
+    clauses = [[var(i, j) for j in range(holes)] for i in range(pigeons)]
+    clauses += [[-var(i, j), -var(k, j)] for j in range(holes) for i in range(pigeons) for k in range(i + 1, pigeons)]
+    return pigeons * holes, clauses
+
+
+class SolverTest(unittest.TestCase):
+
+    def check(self, solver, n, clauses, assumptions=()):
+        """solver answers like brute force for the clauses with the assumptions, and its model satisfies them."""
+        units = [[x] for x in assumptions]
+        expected = brute_force(n, clauses + units)
+        self.assertEqual(solver.solve(assumptions), expected)
+        if expected:
+            self.assertTrue(satisfies(solver.model(), clauses + units))
+
+    def test_luby(self):
+        self.assertEqual([luby(i) for i in range(15)], [1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8])
+
+    def test_random_cnf(self):
+        rng = random.Random(0)
+        for trial in range(300):
+            n = rng.randint(1, 8)
+            clauses = random_cnf(rng, n, rng.randint(1, 40))
+            solver = Solver(n)
+            if not solver.add_clauses(clauses):
+                self.assertFalse(brute_force(n, clauses))
+                continue
+            self.check(solver, n, clauses)
+
+    def test_incremental(self):
+        rng = random.Random(1)
+        for trial in range(100):
+            n = rng.randint(2, 8)
+            clauses = random_cnf(rng, n, rng.randint(1, 15))
+            solver = Solver(n)
+            solver.add_clauses(clauses)
+            for query in range(6):
+                # assumptions of a single query, then a clause added for good between two queries
+                assumptions = [rng.choice((-1, 1)) * v for v in rng.sample(range(1, n + 1), rng.randint(0, n))]
+                self.check(solver, n, clauses, assumptions)
+                clause = random_cnf(rng, n, 1)[0]
+                clauses.append(clause)
+                solver.add_clause(clause)
+            self.check(solver, n, clauses)
+
+    def test_restarts_and_reduce_db(self):
+        n, clauses = pigeonhole(7, 6)
+        solver = Solver(n, restart_base=1)
+        reductions = []
+        reduce_db = solver.reduce_db
+        solver.reduce_db = lambda: reductions.append(len(solver.learnts)) or reduce_db()
+        solver.add_clauses(clauses)
+        self.assertFalse(solver.solve())
+        self.assertGreater(len(reductions), 0)
+        # once unsatisfiable, it stays so
+        self.assertFalse(solver.solve())
+
+    def test_restarts_random_3sat(self):
+        # random 3-SAT around the threshold ratio of 4.26 clauses per variable, both satisfiable and not
+        rng = random.Random(2)
+        for trial in range(20):
+            n = 30
+            clauses = [[rng.choice((-1, 1)) * v for v in rng.sample(range(1, n + 1), 3)] for _ in range(128)]
+            solver = Solver(n, restart_base=1)
+            solver.add_clauses(clauses)
+            if solver.solve():
+                self.assertTrue(satisfies(solver.model(), clauses))
+            # the same answer as with the default restart base
+            other = Solver(n)
+            other.add_clauses(clauses)
+            self.assertEqual(other.solve(), solver.assignment is not None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""
+Checker of the N-queens solutions, shared by solve_linux.py, solve_mac.py and
+the enumeration of queen_solver.py.
+
+A solution is given as the variables that are true (as returned by
+minisat.minisat, the variables after size*size being auxiliary ones). The
+number of queens of every row, column and diagonal is counted with bincount,
+so that a solution is checked in O(n) without building the grid.
+
+>>> failures(4, [2, 8, 9, 15], [(0, 1)])
+[]
+>>> failures(4, [1, 6, 11, 16], [(0, 1)])
+['FAIL. There is more than 1 queen on the left diagonal passing through cell (0,0).', \
+'FAIL. There is no queen in cell (0,1) as required']
+"""
+
+import numpy as np
+
+
+def queen_cells(size, solution):
+    """Rows and columns of the queens of the solution, as two arrays."""
+    cells = np.asarray(solution, dtype=np.int64)
+    cells = cells[(cells > 0) & (cells <= size * size)] - 1
+    return np.divmod(cells, size)
+
+
+def failures(size, solution, queens=()):
+    """Messages describing every constraint that the solution violates, with the pre-placed queens."""
+    rows, cols = queen_cells(size, solution)
+    messages = []
+    if len(rows) != size:
+        messages.append("FAIL. There are {0} queens on the chess.".format(len(rows)))
+    for i in np.flatnonzero(np.bincount(rows, minlength=size) > 1):
+        messages.append("FAIL. There is more than 1 queen on row {0}.".format(i))
+    for j in np.flatnonzero(np.bincount(cols, minlength=size) > 1):
+        messages.append("FAIL. There is more than 1 queen on column {0}.".format(j))
+    # diagonal d holds the cells with row - column = d - (size - 1), it starts on the first column or the first row
+    for d in np.flatnonzero(np.bincount(rows - cols + size - 1, minlength=2 * size - 1) > 1):
+        start = (d - size + 1, 0) if d >= size - 1 else (0, size - 1 - d)
+        messages.append("FAIL. There is more than 1 queen on the left diagonal passing through cell ({0},{1}).".format(
+            *start))
+    # diagonal s holds the cells with row + column = s, it starts on the first row or the last column
+    for s in np.flatnonzero(np.bincount(rows + cols, minlength=2 * size - 1) > 1):
+        start = (0, s) if s <= size - 1 else (s - size + 1, size - 1)
+        messages.append("FAIL. There is more than 1 queen on the right diagonal passing through cell ({0},{1}).".format(
+            *start))
+    if len(queens) > 0:
+        placed = np.asarray(queens, dtype=np.int64).reshape(-1, 2)
+        found = np.isin(placed[:, 0] * size + placed[:, 1], rows * size + cols)
+        for r, c in placed[~found]:
+            messages.append("FAIL. There is no queen in cell ({0},{1}) as required".format(r, c))
+    return messages
+
+
+def is_solution(size, solution, queens=()):
+    return len(failures(size, solution, queens)) == 0
+
+
+def grid_rows(size, solution):
+    """Generator of the rows of the grid of the solution, as lists of 0 and 1, built one at a time."""
+    rows, cols = queen_cells(size, solution)
+    order = np.argsort(rows, kind="stable")
+    rows, cols = rows[order].tolist(), cols[order].tolist()
+    k = 0
+    for i in range(size):
+        row = [0] * size
+        while k < len(rows) and rows[k] == i:
+            row[cols[k]] = 1
+            k += 1
+        yield row
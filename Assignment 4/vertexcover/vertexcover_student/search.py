@@ -8,6 +8,8 @@ from utils import *
 import sys
 import math
 import random
+import time
+from collections import deque
 
 #______________________________________________________________________________
 
@@ -29,6 +31,26 @@ class Problem:
         that yields the successors one at a time, rather than building them
         all at once. Iterators will work fine within the framework."""
         abstract
+
+    def random_successor(self, state):
+        """Return one (action, state) pair drawn uniformly from the successors
+        of state. Override it when a random neighbour can be drawn without
+        building the whole neighbourhood."""
+        return random.choice(list(self.successor(state)))
+
+    def random_move(self, state):
+        """Return a random (action, delta) pair, delta being the change of
+        value that the action brings; result(state, action) is the state it
+        leads to. The default draws a successor with random_successor.
+        Override both methods when a move can be scored without building
+        its state."""
+        act, next = self.random_successor(state)
+        return (act, next), self.value(next) - self.value(state)
+
+    def result(self, state, action):
+        """Return the state reached by doing an action of random_move."""
+        act, next = action
+        return next
     
     def goal_test(self, state):
         """Return True if the state is a goal. The default method compares the
@@ -247,24 +269,90 @@ class LSNode:
 
 
 
-def random_walk(problem, limit=100, callback=None):
+class TabuList:
+    """Short-term memory of a tabu search: a key added at some step stays
+    tabu during the next `tenure` steps. Keys are forgotten as soon as they
+    expire, so the memory holds at most the keys of the last `tenure` steps
+    and a membership test is a dict lookup.
+
+    >>> tabu = TabuList(tenure=1)
+    >>> tabu.add('u', 0)
+    >>> tabu.is_tabu('u', 1), list(tabu.keys(1))
+    (True, ['u'])
+    >>> tabu.is_tabu('u', 2), list(tabu.keys(2))
+    (False, [])
+    """
+
+    def __init__(self, tenure=5):
+        self.tenure = tenure
+        # expiry[key] is the last step at which key is tabu
+        self.expiry = {}
+        self.queue = deque()
+
+    def add(self, key, step):
+        self.expiry[key] = step + self.tenure
+        self.queue.append((step + self.tenure, key))
+
+    def forget(self, step):
+        """Drop the keys that are no longer tabu at the given step."""
+        while self.queue and self.queue[0][0] < step:
+            expiry, key = self.queue.popleft()
+            if self.expiry.get(key) == expiry:
+                del self.expiry[key]
+
+    def is_tabu(self, key, step):
+        return self.expiry.get(key, step - 1) >= step
+
+    def keys(self, step):
+        """Return the keys that are tabu at the given step."""
+        self.forget(step)
+        return self.expiry.keys()
+
+    def __len__(self):
+        return len(self.expiry)
+
+
+def local_search_done(problem, best, start, time_limit):
+    """Return True once the best node is a goal or time_limit seconds (if
+    not None) have passed since start."""
+    return problem.goal_test(best.state) or \
+        (time_limit is not None and time.perf_counter() - start >= time_limit)
+
+
+def local_search_result(best, n_nodes, start):
+    """Record on the returned node the number of nodes the search went
+    through (n_nodes) and the time it took (elapsed, in seconds)."""
+    best.n_nodes = n_nodes
+    best.elapsed = time.perf_counter() - start
+    return best
+
+
+def random_walk(problem, limit=100, callback=None, time_limit=None):
     """Perform a random walk in the search space and return the best solution
     found. The returned value is a Node.
     If callback is not None, it must be a one-argument function that will be
     called at each step with the current node.
+    The walk stops early when the best node is a goal or after time_limit
+    seconds; see local_search_result for the statistics of the result.
     """
+    start = time.perf_counter()
     current = LSNode(problem, problem.initial, 0)
     best = current
+    n_nodes = 1
     for step in range(limit):
+        if local_search_done(problem, best, start, time_limit):
+            break
         if callback is not None:
             callback(current)
         # print(current)
         # print("len = ", len(current.expand()))
         # print("limit = ", step)
-        current = random.choice(list(current.expand()))
+        act, next = problem.random_successor(current.state)
+        current = LSNode(problem, next, current.step + 1)
+        n_nodes += 1
         if current.value() > best.value():
             best = current
-    return best
+    return local_search_result(best, n_nodes, start)
 
 
 def exp_schedule(k=20, lam=0.05, limit=100):
@@ -272,27 +360,32 @@ def exp_schedule(k=20, lam=0.05, limit=100):
     return lambda t: (k * math.exp(-lam * t) if t < limit else 0)
 
 
-def simulated_annealing(problem, schedule=exp_schedule(), callback=None):
+def simulated_annealing(problem, schedule=exp_schedule(), callback=None, time_limit=None):
     """[Fig. 4.5]
     If callback is not None, it must be a one-argument function that will be
     called at each step with the current node.
+    The search stops early when the best node is a goal or after time_limit
+    seconds; see local_search_result for the statistics of the result.
     """
+    start = time.perf_counter()
     current = LSNode(problem, problem.initial, 0)
     best = current
+    n_nodes = 1
     for t in range(sys.maxsize):
+        if local_search_done(problem, best, start, time_limit):
+            break
         if callback is not None:
             callback(current)
         T = schedule(t)
         if T == 0:
-            return best
-        next = random.choice(list(current.expand()))
-        delta_e = next.value() - current.value()
+            break
+        # the move is scored first, its state is only built if it is accepted
+        act, delta_e = problem.random_move(current.state)
+        n_nodes += 1
         if delta_e > 0 or math.exp(delta_e / T) > random.uniform(0.0, 1.0):
-            current = next
+            current = LSNode(problem, problem.result(current.state, act), current.step + 1)
             if(current.value() > best.value()):
                 best = current
         else:
             current = LSNode(problem, current.state, t + 1)
-
-
-
+    return local_search_result(best, n_nodes, start)
@@ -0,0 +1,84 @@
+"""Tests of the incremental State of vertexcover.py: run with python -m unittest (or pytest) from this directory."""
+import pickle
+import random
+import unittest
+
+from vertexcover import CoverArrays, State
+
+
+def random_graph(rng, n_vertices, n_edges):
+    vertices = {v: [] for v in range(n_vertices)}
+    edges = {}
+    for e in range(1, n_edges + 1):
+        v1, v2 = rng.sample(range(n_vertices), 2)
+        edges[e] = (v1, v2)
+        vertices[v1].append(e)
+        vertices[v2].append(e)
+    return vertices, edges
+
+
+class StateTest(unittest.TestCase):
+
+    def assert_consistent(self, state):
+        """The values of state are the ones of arrays built from scratch for its cover."""
+        fresh = CoverArrays(state.vertices, state.edges, list(state.cover), list(state.not_cover))
+        self.assertEqual(len(state.cover), state.k)
+        self.assertEqual(sorted(list(state.cover) + list(state.not_cover)), list(range(state.n_vertices)))
+        self.assertEqual(list(state.in_cover), list(fresh.in_cover))
+        self.assertEqual(list(state.covered), fresh.covered)
+        self.assertEqual(list(state.gain), fresh.gain)
+        self.assertEqual(state.score, sum(1 for e in state.edges if fresh.covered[e] > 0))
+
+    def random_chain(self, rng, state, length):
+        """States reached by random swaps and removals, each from a random earlier state."""
+        states = [state]
+        for _ in range(length):
+            state = rng.choice(states)
+            if state.k > 1 and rng.random() < 0.1:
+                states.append(state.without(rng.choice(state.cover)))
+            else:
+                states.append(state.swap(rng.choice(state.cover), rng.choice(state.not_cover)))
+        return states
+
+    def test_random_chains(self):
+        rng = random.Random(0)
+        for trial in range(20):
+            vertices, edges = random_graph(rng, rng.randint(5, 40), rng.randint(1, 120))
+            state = State(rng.randint(1, len(vertices) - 1), vertices, edges, init=rng.choice(["greedy", "first"]))
+            states = self.random_chain(rng, state, 200)
+            covers = [(list(s.cover), list(s.not_cover)) for s in states]
+            # every state, visited in random order, still has its own values
+            for i in rng.sample(range(len(states)), len(states)):
+                self.assertEqual((list(states[i].cover), list(states[i].not_cover)), covers[i])
+                self.assert_consistent(states[i])
+
+    def test_pickle(self):
+        rng = random.Random(1)
+        vertices, edges = random_graph(rng, 30, 80)
+        states = self.random_chain(rng, State(10, vertices, edges), 100)
+        for state in rng.sample(states, 20):
+            copy = pickle.loads(pickle.dumps(state))
+            self.assertEqual(list(copy.cover), list(state.cover))
+            self.assert_consistent(copy)
+            # the copy has its own arrays: moving it leaves the original unchanged
+            for moved in self.random_chain(rng, copy, 20):
+                self.assert_consistent(moved)
+            self.assert_consistent(state)
+
+    def test_no_aliasing(self):
+        rng = random.Random(2)
+        vertices, edges = random_graph(rng, 20, 50)
+        mine = list(range(8))
+        state = State(8, vertices, edges, cover=mine)
+        cover, gain = state.cover, list(state.gain)
+        swapped = state.swap(0, 10)
+        self.assertEqual(mine, list(range(8)))
+        self.assertEqual(list(cover), list(range(8)))
+        self.assertEqual(list(state.gain), gain)
+        self.assertIn(10, swapped.cover)
+        with self.assertRaises(TypeError):
+            state.cover[0] = 10
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,8 @@
 """Provide some widely useful utilities. "from utils import *".
 
 """
-import bisect
+import heapq
+import itertools
 
 #______________________________________________________________________________
 # Queues: Stack, FIFOQueue, PriorityQueue
@@ -47,37 +48,23 @@ class FIFOQueue(Queue):
             self.start = 0
         return e
 
-class PriorityQueueElmt:
-    """ The elements of the priority queue """
-    def __init__(self,val,e):
-        self.val = val
-        self.e = e
-    
-    def __lt__(self,other):
-        return self.val < other.val
-    
-    def value(self):
-        return self.val
-    
-    def elem(self):
-        return self.e
-        
-
 class PriorityQueue(Queue):
     """A queue in which the minimum (or maximum) element (as determined by f and
     order) is returned first. If order is min, the item with minimum f(x) is
-    returned first; if order is max, then it is the item with maximum f(x)."""
+    returned first; if order is max, then it is the item with maximum f(x).
+    Items are kept in a binary heap of (key, count, item) tuples; the counter
+    makes items with the same f(x) come out in insertion order."""
     def __init__(self, f, order=min):
         self.A=[]
         self.order=order
         self.f=f
+        self.counter = itertools.count()
     def append(self, item):
-        queueElmt = PriorityQueueElmt(self.f(item),item)
-        bisect.insort(self.A, queueElmt)
+        key = self.f(item)
+        if self.order != min:
+            key = -key
+        heapq.heappush(self.A, (key, next(self.counter), item))
     def __len__(self):
         return len(self.A)
     def pop(self):
-        if self.order == min:
-            return self.A.pop(0).elem()
-        else:
-            return self.A.pop().elem()
\ No newline at end of file
+        return heapq.heappop(self.A)[2]
@@ -2,35 +2,62 @@
 """NAMES OF THE AUTHOR(S): Nicolas Golenvaux <nicolas.golenvaux@uclouvain.be>"""
 from matplotlib.pyplot import step
 from search import *
+import copy
+import gc
+import heapq
+import multiprocessing
+import numpy as np
 import sys
 import time
 import os
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
 
-used_covers = set()
 
 class VertexCover(Problem):
 
-    def __init__(self, initial, goal=None):
+    def __init__(self, initial, goal=None, vectorized=True):
         super().__init__(initial, goal)
+        self.evaluator = SwapEvaluator(initial.vertices, initial.edges) if vectorized else None
 
     # if you want you can implement this method and use it in the maxvalue and randomized_maxvalue functions
     # neighborhood relation
     def successor(self, state):
-        global used_covers
         successors = []
-        worse_successors = []
-        for old_vertice_index in range(len(state.cover)):
+        for old_vertice in state.cover:
             for new_vertice in state.not_cover:
-                new_cover = state.cover.copy()
-                new_cover[old_vertice_index] = new_vertice
-                if tuple(new_cover) in used_covers:
-                    worse_successors.append((None, State(k=state.k, vertices=state.vertices, edges=state.edges, cover=new_cover)))
-                    # continue
-                used_covers.add(tuple(new_cover))
                 # appending None as action along with the new state, because it is not used but is necessary for the successor function
-                successors.append((None, State(k=state.k, vertices=state.vertices, edges=state.edges, cover=new_cover)))
-        return successors if len(successors) > 0 else worse_successors
-        # return successors
+                successors.append((None, state.swap(old_vertice, new_vertice)))
+        return successors
+
+    def random_successor(self, state):
+        # a single random swap, without building the whole neighbourhood
+        arrays = state.arrays()
+        return None, state.swap(random.choice(arrays.cover), random.choice(arrays.not_cover))
+
+    def random_move(self, state):
+        # the score change of a random swap, without building its state
+        arrays = state.arrays()
+        u, v = random.choice(arrays.cover), random.choice(arrays.not_cover)
+        return (u, v), state.swap_delta(u, v)
+
+    def result(self, state, action):
+        return state.swap(*action)
+
+    def goal_test(self, state):
+        # a cover of k vertices covering every edge cannot be improved
+        return state.score == state.n_edges
+
+    def best_swaps(self, state, n=1, tabu=(), aspiration=None):
+        """
+        Return the n best (delta, u, v) swaps of state, best first. Swaps moving a vertex of tabu are ignored, unless the
+        resulting score is above aspiration.
+        """
+        if self.evaluator is not None:
+            return self.evaluator.best_swaps(state, n, tabu, aspiration)
+        return heapq.nlargest(n, (s for s in state.swap_deltas()
+                                  if (s[1] not in tabu and s[2] not in tabu)
+                                  or (aspiration is not None and state.score + s[0] > aspiration)))
 
     # if you want you can implement this method and use it in the maxvalue and randomized_maxvalue functions
     def value(self, state):
@@ -38,34 +65,175 @@ class VertexCover(Problem):
 
 
 class State:
+    """
+    A cover of k vertices with its incremental bookkeeping (see CoverArrays). The states reached from one another by swap
+    and without share a single CoverArrays, which holds the arrays of the last of them that was accessed; every other
+    state keeps the move leading to its neighbour on the way to that one (its link). Reading the arrays of a state first
+    replays these moves in place (rerooting), so a swap costs O(deg u + deg v) instead of a copy of the arrays while every
+    state keeps its own value.
+    """
 
-    def __init__(self, k, vertices, edges, cover=None, not_cover=None):
+    def __init__(self, k, vertices, edges, cover=None, not_cover=None, init="greedy"):
         self.k = k
         self.n_vertices = len(vertices)
         self.vertices = vertices
         self.n_edges = len(edges)
         self.edges = edges
         if cover is None:
-            self.cover = self.build_init()
-        else:
-            self.cover = cover
-        if not_cover is None:
-            self.not_cover = [v for v in range(self.n_vertices) if v not in self.cover]
-        else:
-            self.not_cover = not_cover
+            cover = self.build_init(init)
+        self._link = self._move = None
+        # the arrays are updated in place by the moves, the caller keeps its own lists
+        self._arrays = CoverArrays(vertices, edges, list(cover), None if not_cover is None else list(not_cover))
         # the score is the number of edges that are covered
         self.score = self.compute_score()
 
     # an init state building is provided here but you can change it at will
-    def build_init(self):
-        return list(range(self.k))
+    def build_init(self, init="greedy"):
+        """
+        Initial cover of k vertices. init is "first" (the vertices 0..k-1), "greedy" (max-degree greedy), "matching"
+        (endpoints of a maximal matching, a 2-approximation of the minimum cover) or "random_greedy" (greedy picking among
+        the vertices whose gain is close to the best one).
+        """
+        if init == "first":
+            return list(range(self.k))
+        if init == "greedy":
+            cover = self.greedy_cover()
+        elif init == "random_greedy":
+            cover = self.random_greedy_cover()
+        elif init == "matching":
+            cover = self.matching_cover()
+        else:
+            raise ValueError("unknown init: " + str(init))
+        return self.fit_cover(cover)
 
-    def compute_score(self):
-        score = 0
+    def greedy_cover(self):
+        """Repeatedly add the vertex covering the most uncovered edges, until every edge is covered or k is reached."""
+        uncovered = [len(self.vertices[v]) for v in range(self.n_vertices)]
+        done = set()
+        cover = []
+        heap = [(-uncovered[v], v) for v in range(self.n_vertices)]
+        heapq.heapify(heap)
+        while heap and len(cover) < self.k and len(done) < self.n_edges:
+            count, v = heapq.heappop(heap)
+            if -count != uncovered[v]:
+                # stale entry: some of its edges were covered since it was pushed
+                heapq.heappush(heap, (-uncovered[v], v))
+                continue
+            if uncovered[v] == 0:
+                break
+            cover.append(v)
+            self.cover_edges(v, done, uncovered)
+        return cover
+
+    def random_greedy_cover(self, alpha=0.5):
+        """Like greedy_cover, but each vertex is drawn among those covering at least alpha times the best count."""
+        uncovered = [len(self.vertices[v]) for v in range(self.n_vertices)]
+        done = set()
+        cover = []
+        while len(cover) < self.k and len(done) < self.n_edges:
+            best = max(uncovered)
+            v = random.choice([w for w in range(self.n_vertices) if uncovered[w] > 0 and uncovered[w] >= alpha * best])
+            cover.append(v)
+            self.cover_edges(v, done, uncovered)
+        return cover
+
+    def cover_edges(self, v, done, uncovered):
+        # marks the edges of v as covered, v and its neighbours have that many less uncovered edges
+        for e in self.vertices[v]:
+            if e not in done:
+                done.add(e)
+                v1, v2 = self.edges[e]
+                uncovered[v1] -= 1
+                uncovered[v2] -= 1
+
+    def matching_cover(self):
+        """Both endpoints of every edge of a maximal matching, highest degrees first."""
+        matched = bytearray(self.n_vertices)
         for v1, v2 in self.edges.values():
-            if v1 in self.cover or v2 in self.cover:
-                score += 1
-        return score
+            if not matched[v1] and not matched[v2]:
+                matched[v1] = matched[v2] = 1
+        return sorted((v for v in range(self.n_vertices) if matched[v]), key=lambda v: -len(self.vertices[v]))
+
+    def fit_cover(self, cover):
+        """Trim cover to its first k vertices, or pad it with the highest degree vertices that are not in it."""
+        cover = cover[:self.k]
+        if len(cover) < self.k:
+            chosen = set(cover)
+            rest = sorted((v for v in range(self.n_vertices) if v not in chosen), key=lambda v: -len(self.vertices[v]))
+            cover += rest[:self.k - len(cover)]
+        return cover
+
+    def compute_score(self):
+        covered = self.arrays().covered
+        return sum(1 for e in self.edges if covered[e] > 0)
+
+    def swap_delta(self, u, v):
+        """Score change when replacing u (in the cover) by v (not in it), computed in O(deg u)."""
+        # an edge between u and v is lost by removing u but covered again by v
+        shared = sum(1 for e in self.vertices[u] if v in self.edges[e])
+        gain = self.arrays().gain
+        return gain[v] - gain[u] + shared
+
+    def swap_deltas(self):
+        """Yield (delta, u, v) for every swap of u in the cover with v out of it, without building any State."""
+        # the values of this state are taken at once, other states may use the arrays while the generator runs
+        arrays = self.arrays()
+        cover, not_cover, gain = list(arrays.cover), list(arrays.not_cover), list(arrays.gain)
+        for u in cover:
+            shared = {}
+            for e in self.vertices[u]:
+                v1, v2 = self.edges[e]
+                other = v2 if v1 == u else v1
+                shared[other] = shared.get(other, 0) + 1
+            loss = gain[u]
+            for v in not_cover:
+                yield gain[v] - loss + shared.get(v, 0), u, v
+
+    def arrays(self):
+        """The CoverArrays holding the values of this state, rerooted on it if another state held them."""
+        if self._link is not None:
+            path = []
+            state = self
+            while state._link is not None:
+                path.append(state)
+                state = state._link
+            # replayed from the state holding the arrays, each state now links to the one replaying its move
+            for state in reversed(path):
+                link = state._link
+                link._link, link._move = state, self._arrays.apply(state._move)
+                state._link = state._move = None
+        return self._arrays
+
+    # read-only views of the arrays that keep showing the values of this state whatever the other states do
+    cover = property(lambda self: ArrayView(self, "cover"))
+    not_cover = property(lambda self: ArrayView(self, "not_cover"))
+    in_cover = property(lambda self: ArrayView(self, "in_cover"))
+    covered = property(lambda self: ArrayView(self, "covered"))
+    gain = property(lambda self: ArrayView(self, "gain"))
+
+    def successor_state(self, move, **changes):
+        # new state holding the arrays once move is applied, self links to it by the inverse move
+        arrays = self.arrays()
+        state = State.__new__(State)
+        state.__dict__.update(self.__dict__)
+        state.__dict__.update(changes)
+        self._link, self._move = state, arrays.apply(move)
+        return state
+
+    def swap(self, u, v):
+        """Return the State where u is replaced by v in the cover, in O(deg u + deg v) (see CoverArrays.swap)."""
+        return self.successor_state((CoverArrays.swap, u, v), score=self.score + self.swap_delta(u, v))
+
+    def without(self, u):
+        """Return the State of size k-1 where u is removed from the cover, in O(deg u) (see CoverArrays.remove)."""
+        return self.successor_state((CoverArrays.remove, u), k=self.k - 1, score=self.score - self.arrays().gain[u])
+
+    def __getstate__(self):
+        # a pickled state takes a copy of its own arrays, not the states it links to
+        arrays = self.arrays().copy()
+        state = self.__dict__.copy()
+        state["_arrays"] = arrays
+        return state
 
     def __str__(self):
         s = '\\{'
@@ -73,6 +241,223 @@ class State:
             s += str(v) + ','
         return s[:-1]+'\\}'
 
+class ArrayView(Sequence):
+    """Read-only view of an array of a State (see CoverArrays), rerooting the arrays on the state at every access."""
+
+    __slots__ = ("state", "name")
+
+    def __init__(self, state, name):
+        self.state = state
+        self.name = name
+
+    def __getitem__(self, i):
+        return getattr(self.state.arrays(), self.name)[i]
+
+    def __len__(self):
+        return len(getattr(self.state.arrays(), self.name))
+
+    def __iter__(self):
+        # over a copy, so that moves made while iterating do not change what is seen
+        return iter(list(getattr(self.state.arrays(), self.name)))
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class CoverArrays:
+    """
+    The arrays of a cover, updated in place by its moves: swap, remove and add. Each move returns the move that undoes it,
+    as a (function, *arguments) tuple given to apply.
+    - cover and not_cover are the vertices in and out of the cover, position[v] is the index of v in the one holding it,
+    - in_cover[v] is 1 iff v is in the cover,
+    - covered[e] is the number of endpoints of edge e that are in the cover (0, 1 or 2),
+    - gain[v] is, for a vertex out of the cover, the number of uncovered edges it would cover and, for a vertex in the
+      cover, the number of edges that only it covers (i.e. that would be lost by removing it).
+    """
+
+    def __init__(self, vertices, edges, cover, not_cover=None):
+        n_vertices = len(vertices)
+        self.vertices = vertices
+        self.edges = edges
+        self.cover = cover
+        self.in_cover = bytearray(n_vertices)
+        for v in cover:
+            self.in_cover[v] = 1
+        if not_cover is None:
+            not_cover = [v for v in range(n_vertices) if not self.in_cover[v]]
+        self.not_cover = not_cover
+        self.position = [0] * n_vertices
+        for vs in (cover, not_cover):
+            for i, v in enumerate(vs):
+                self.position[v] = i
+        self.covered = [0] * (max(edges, default=-1) + 1)
+        for e, (v1, v2) in edges.items():
+            self.covered[e] = self.in_cover[v1] + self.in_cover[v2]
+        self.gain = [0] * n_vertices
+        for v in range(n_vertices):
+            target = 1 if self.in_cover[v] else 0
+            self.gain[v] = sum(1 for e in vertices[v] if self.covered[e] == target)
+
+    def copy(self):
+        arrays = CoverArrays.__new__(CoverArrays)
+        arrays.__dict__.update(self.__dict__)
+        for name in ("cover", "not_cover", "position", "in_cover", "covered", "gain"):
+            setattr(arrays, name, getattr(self, name).copy())
+        return arrays
+
+    def apply(self, move):
+        return move[0](self, *move[1:])
+
+    def leave(self, u):
+        # the edges of u lose an endpoint in the cover, gain[u] keeps its value: the edges only u covered are exactly the
+        # uncovered ones once it is out
+        covered, gain, edges = self.covered, self.gain, self.edges
+        self.in_cover[u] = 0
+        for e in self.vertices[u]:
+            v1, v2 = edges[e]
+            covered[e] -= 1
+            gain[v2 if v1 == u else v1] += 1
+
+    def enter(self, v):
+        # the edges of v gain an endpoint in the cover, gain[v] keeps its value: the uncovered edges of v are exactly the
+        # ones only it covers once it is in
+        covered, gain, edges = self.covered, self.gain, self.edges
+        self.in_cover[v] = 1
+        for e in self.vertices[v]:
+            v1, v2 = edges[e]
+            covered[e] += 1
+            gain[v2 if v1 == v else v1] -= 1
+
+    def swap(self, u, v):
+        """Replace u (in the cover) by v (out of it), each taking the position of the other."""
+        i, j = self.position[u], self.position[v]
+        self.cover[i], self.not_cover[j] = v, u
+        self.position[u], self.position[v] = j, i
+        self.leave(u)
+        self.enter(v)
+        return CoverArrays.swap, v, u
+
+    def remove(self, u):
+        """Remove u from the cover: the last vertex of cover takes its position and u is appended to not_cover."""
+        i = self.position[u]
+        last = self.cover.pop()
+        if last != u:
+            self.cover[i] = last
+            self.position[last] = i
+        self.position[u] = len(self.not_cover)
+        self.not_cover.append(u)
+        self.leave(u)
+        return CoverArrays.add, u, i
+
+    def add(self, u, i):
+        """Undo remove(u): u is the last vertex of not_cover and goes back to position i of cover."""
+        self.not_cover.pop()
+        if i < len(self.cover):
+            self.position[self.cover[i]] = len(self.cover)
+            self.cover.append(self.cover[i])
+            self.cover[i] = u
+        else:
+            self.cover.append(u)
+        self.position[u] = i
+        self.enter(u)
+        return CoverArrays.remove, u
+
+
+class SwapEvaluator:
+    """
+    Scores all the swaps of a state with NumPy. The graph is kept as an (n_edges, 2) array of edge endpoints; for a state,
+    the coverage count of every edge is derived from its in_cover bitset and the gain of every vertex is obtained with
+    bincount. The score changes of swapping the i-th cover vertex with the j-th non-cover vertex are then built as a matrix
+    (an edge between the two contributes +1, since it stays covered), by blocks of rows of at most block_size entries so
+    that the memory stays bounded on large graphs.
+    """
+
+    # value of the swaps that are ruled out, below any score change
+    FORBIDDEN = np.iinfo(np.int64).min
+
+    def __init__(self, vertices, edges, block_size=1 << 20):
+        self.n_vertices = len(vertices)
+        self.block_size = block_size
+        if isinstance(edges, EdgeView):
+            # the CSR graph already has the endpoint array
+            self.ends = edges.graph.ends
+        else:
+            self.ends = np.array([edges[e] for e in sorted(edges)], dtype=np.int64).reshape(-1, 2)
+
+    def gain_blocks(self, cover, not_cover, in_cover):
+        """
+        Generator of (start, matrix) where matrix[i, j] is the score change of swapping cover[start + i] with not_cover[j],
+        for consecutive blocks of rows.
+        """
+        in_cover = np.frombuffer(bytes(in_cover), dtype=np.uint8)
+        ends_in = in_cover[self.ends]
+        covered = ends_in.sum(axis=1)
+        # uncovered edges: both endpoints would gain them; edges covered once: lost by their endpoint in the cover
+        gain = np.bincount(self.ends[covered == 0].ravel(), minlength=self.n_vertices)
+        single = covered == 1
+        owner = np.where(ends_in[single, 0] == 1, self.ends[single, 0], self.ends[single, 1])
+        other = np.where(ends_in[single, 0] == 1, self.ends[single, 1], self.ends[single, 0])
+        loss = np.bincount(owner, minlength=self.n_vertices)
+
+        position = np.empty(self.n_vertices, dtype=np.int64)
+        position[cover] = np.arange(len(cover))
+        position[not_cover] = np.arange(len(not_cover))
+        # the edges covered once, sorted by the row of their owner, so that each block takes a slice of them
+        rows = position[owner]
+        order = np.argsort(rows, kind="stable")
+        rows, cols = rows[order], position[other][order]
+        gain = gain[not_cover]
+        step = max(1, self.block_size // max(1, len(not_cover)))
+        for start in range(0, len(cover), step):
+            stop = min(start + step, len(cover))
+            matrix = gain[np.newaxis, :] - loss[cover[start:stop]][:, np.newaxis]
+            lo, hi = np.searchsorted(rows, (start, stop))
+            np.add.at(matrix, (rows[lo:hi] - start, cols[lo:hi]), 1)
+            yield start, matrix
+
+    def best_swaps(self, state, n=1, tabu=(), aspiration=None):
+        """
+        Return the n best (delta, u, v) swaps of state, best first (ties in the order of cover then not_cover). Swaps
+        moving a vertex of tabu are ignored, unless the resulting score is above aspiration. Only the n best swaps seen so
+        far are kept from one block to the next.
+        """
+        arrays = state.arrays()
+        cover = np.array(arrays.cover, dtype=np.int64)
+        not_cover = np.array(arrays.not_cover, dtype=np.int64)
+        if len(cover) == 0 or len(not_cover) == 0:
+            return []
+        if tabu:
+            locked = np.fromiter(tabu, dtype=np.int64)
+            locked_rows = np.isin(cover, locked)
+            locked_cols = np.isin(not_cover, locked)
+        best_values = np.empty(0, dtype=np.int64)
+        best_index = np.empty(0, dtype=np.int64)
+        for start, matrix in self.gain_blocks(cover, not_cover, arrays.in_cover):
+            if tabu:
+                forbidden = locked_rows[start:start + len(matrix), np.newaxis] | locked_cols[np.newaxis, :]
+                if aspiration is not None:
+                    forbidden &= matrix + state.score <= aspiration
+                matrix[forbidden] = self.FORBIDDEN
+            flat = matrix.ravel()
+            if n == 1:
+                top = np.array([np.argmax(flat)])
+            elif n < flat.size:
+                # the values above the n-th largest one and the first ones equal to it
+                threshold = np.partition(flat, flat.size - n)[flat.size - n]
+                above = np.flatnonzero(flat > threshold)
+                top = np.concatenate((above, np.flatnonzero(flat == threshold)[:n - len(above)]))
+            else:
+                top = np.arange(flat.size)
+            top = top[flat[top] != self.FORBIDDEN]
+            # running top n, the flat indices of the whole matrix breaking the ties
+            values = np.concatenate((best_values, flat[top]))
+            index = np.concatenate((best_index, top + start * len(not_cover)))
+            order = np.lexsort((index, -values))[:n]
+            best_values, best_index = values[order], index[order]
+        rows, cols = np.divmod(best_index, len(not_cover))
+        return [(int(d), int(cover[i]), int(not_cover[j])) for d, i, j in zip(best_values, rows, cols)]
+
+
 # k is the size of the best subset to find
 # vertices[i] is the list of edges that are connected to vertice i
 # edges[i] is the pair of vertices that are connected by edge i
@@ -96,67 +481,256 @@ def read_instance(instanceFile):
     return k, vertices, edges
 
 
+class Graph:
+    """
+    Graph parsed at once by read_graph. The vertices and edges attributes are the dicts of read_instance, built from the
+    arrays of the whole file, where every edge id and every vertex is a single Python int shared by all the lists and
+    tuples holding it. Only ends is kept as an array: ends[i] are the endpoints of the i-th edge, for SwapEvaluator.
+    """
+
+    def __init__(self, n_vertices, edge_ids, ends):
+        self.n_vertices = n_vertices
+        self.n_edges = len(edge_ids)
+        self.ends = ends
+        ids = edge_ids.tolist()
+        names = list(range(n_vertices))
+        # the edges of each vertex in the order of the file: every edge appears once in the adjacency of each endpoint
+        order = np.argsort(ends.ravel(), kind="stable")
+        incident = list(map(ids.__getitem__, (order // 2).tolist()))
+        offsets = np.zeros(n_vertices + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ends.ravel(), minlength=n_vertices), out=offsets[1:])
+        offsets = offsets.tolist()
+        del order
+        self.vertices = VertexView(self, ((v, incident[offsets[v]:offsets[v + 1]]) for v in names))
+        del incident
+        pairs = zip(map(names.__getitem__, ends[:, 0].tolist()), map(names.__getitem__, ends[:, 1].tolist()))
+        self.edges = EdgeView(self, zip(ids, pairs))
+
+
+class VertexView(dict):
+    """vertices[v] is the list of the ids of the edges of v, a plain dict that also refers to its graph."""
+
+    def __init__(self, graph, items):
+        super().__init__(items)
+        self.graph = graph
+
+
+class EdgeView(dict):
+    """edges[e] is the pair of vertices of the edge of id e, a plain dict that also refers to its graph."""
+
+    def __init__(self, graph, items):
+        super().__init__(items)
+        self.graph = graph
+
+
+def read_graph(instanceFile):
+    """
+    Same as read_instance, but the whole file is parsed at once into a Graph. Returns k and the graph; State(k,
+    graph.vertices, graph.edges) then works on the same dicts as with read_instance, and SwapEvaluator on graph.ends.
+    """
+    with open(instanceFile) as file:
+        data = np.fromstring(file.read(), dtype=np.int64, sep=' ')
+    k, n_vertices = int(data[0]), int(data[1])
+    lines = data[3:].reshape(-1, 3)
+    edge_ids, ends = lines[:, 0].copy(), lines[:, 1:].copy()
+    del data, lines
+    # the dicts hold no reference cycle: the collector is paused while their many lists and tuples are created
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return k, Graph(n_vertices, edge_ids, ends)
+    finally:
+        if enabled:
+            gc.enable()
+
+
 # Attention : Depending of the objective function you use, your goal can be to maximize or to minimize it
-def maxvalue(problem, limit=100, callback=None):
+def maxvalue(problem, limit=100, callback=None, tenure=5, time_limit=None):
+    start = time.perf_counter()
     current = LSNode(problem, problem.initial, 0)
     best = current
+    n_nodes = 1
+    tabu = TabuList(tenure)
 
     for step in range(limit):
+        # stop as soon as every edge is covered or the time budget is spent
+        if local_search_done(problem, best, start, time_limit):
+            break
         if callback is not None:
             callback(current)
-        successors = problem.successor(current.state)
-        if len(successors) == 0:
-            return best
-        # sort successors based on their score
-        successors.sort(key=lambda x: x[1].score, reverse=True)
+        # best swap whose vertices did not move during the last steps, unless it beats the best score
+        swaps = problem.best_swaps(current.state, 1, tabu.keys(step), best.value())
+        if len(swaps) == 0:
+            swaps = problem.best_swaps(current.state, 1)
+        if len(swaps) == 0:
+            break
+        _, u, v = swaps[0]
+        tabu.add(u, step)
+        tabu.add(v, step)
         # new node is initialized with the best successor
-        current = LSNode(problem, successors[0][1], current.step + 1)
+        current = LSNode(problem, current.state.swap(u, v), current.step + 1)
+        n_nodes += 1
         if current.value() > best.value():
             best = current
 
-    return best
+    return local_search_result(best, n_nodes, start)
 
 # Attention : Depending of the objective function you use, your goal can be to maximize or to minimize it
-def randomized_maxvalue(problem, limit=100, callback=None):
+def randomized_maxvalue(problem, limit=100, callback=None, tenure=5, time_limit=None):
+    start = time.perf_counter()
     current = LSNode(problem, problem.initial, 0)
     best = current
+    n_nodes = 1
+    tabu = TabuList(tenure)
 
     for step in range(limit):
+        # stop as soon as every edge is covered or the time budget is spent
+        if local_search_done(problem, best, start, time_limit):
+            break
         if callback is not None:
             callback(current)
-        successors = problem.successor(current.state)
-        best_of_n = 5
-        if len(successors) < 5:
-            best_of_n = len(successors)
-        # sort successors based on their score
-        successors.sort(key=lambda x: x[1].score, reverse=True)
-        # select a random successor from the 5 best ones
-        current = LSNode(problem, successors[random.randint(0, best_of_n-1)][1], current.step + 1)
+        # select a random swap from the 5 best ones that are not tabu
+        swaps = problem.best_swaps(current.state, 5, tabu.keys(step), best.value())
+        if len(swaps) == 0:
+            swaps = problem.best_swaps(current.state, 5)
+        if len(swaps) == 0:
+            break
+        _, u, v = random.choice(swaps)
+        tabu.add(u, step)
+        tabu.add(v, step)
+        current = LSNode(problem, current.state.swap(u, v), current.step + 1)
+        n_nodes += 1
         if current.value() > best.value():
             best = current
 
+    return local_search_result(best, n_nodes, start)
+
+
+def minimum_cover(problem, search=maxvalue, limit=100, time_limit=None):
+    """
+    Minimum vertex cover: once `search` (called as search(problem, limit, time_limit=...)) covers every edge with k
+    vertices, the vertex whose removal uncovers the fewest edges is dropped and the search is run again on the k-1 cover
+    from that state, until it cannot repair the cover any more or the `time_limit` seconds are spent.
+    Returns the LSNode of the smallest full cover found (its state.k is the size), or None if the initial k was not enough.
+    """
+    start = time.perf_counter()
+    best = None
+    node = search(problem, limit, time_limit=time_limit)
+    while problem.goal_test(node.state):
+        best = node
+        remaining = None if time_limit is None else time_limit - (time.perf_counter() - start)
+        if node.state.k == 0 or (remaining is not None and remaining <= 0):
+            break
+        state = node.state
+        # warm start: the problem (and its evaluator) is shared, only the initial state changes
+        problem = copy.copy(problem)
+        problem.initial = state.without(min(state.cover, key=lambda v: state.gain[v]))
+        node = search(problem, limit, time_limit=remaining)
     return best
 
 
+#####################
+#     Portfolio     #
+#####################
+ALGORITHMS = {
+    "maxvalue": lambda problem, limit, callback, time_limit:
+        maxvalue(problem, limit, callback, time_limit=time_limit),
+    "randomized_maxvalue": lambda problem, limit, callback, time_limit:
+        randomized_maxvalue(problem, limit, callback, time_limit=time_limit),
+    "random_walk": lambda problem, limit, callback, time_limit:
+        random_walk(problem, limit, callback, time_limit),
+    "simulated_annealing": lambda problem, limit, callback, time_limit:
+        simulated_annealing(problem, exp_schedule(limit=limit), callback, time_limit),
+}
+
+# best score found so far by any worker of the running portfolio, and the graph (k, vertices, edges and whether the swaps
+# are scored with NumPy) of its problem, set by init_worker in each process
+shared_best = None
+shared_graph = None
+
+
+class StopSearch(Exception):
+    """Raised from a callback to interrupt a local search."""
+
+
+def init_worker(best, graph):
+    global shared_best, shared_graph
+    shared_best = best
+    shared_graph = graph
+
+
+def run_restart(algorithm, seed, limit, time_limit=None, init="random_greedy"):
+    """
+    Runs one restart of a portfolio in a worker process, on the graph of shared_graph. The initial state is built with init
+    (see State.build_init) after seeding the random generator with seed, so that restarts of different seeds start from
+    different covers even for a deterministic search. The callback keeps track of the best node seen, publishes its score
+    in shared_best and stops the search as soon as another worker has covered every edge (a run covering every edge stops
+    by itself).
+    Returns a dict with the algorithm, the seed, the best state and its step, the elapsed time and whether it was stopped by
+    another worker.
+    """
+    random.seed(seed)
+    k, vertices, edges, vectorized = shared_graph
+    problem = VertexCover(State(k, vertices, edges, init=init), vectorized=vectorized)
+    seen = [None]
+
+    def callback(node):
+        if seen[0] is None or node.value() > seen[0].value():
+            seen[0] = node
+            with shared_best.get_lock():
+                shared_best.value = max(shared_best.value, node.value())
+        if shared_best.value >= problem.initial.n_edges:
+            raise StopSearch()
+
+    start = time.perf_counter()
+    stopped = False
+    try:
+        node = ALGORITHMS[algorithm](problem, limit, callback, time_limit)
+        with shared_best.get_lock():
+            shared_best.value = max(shared_best.value, node.value())
+    except StopSearch:
+        node = seen[0]
+        stopped = True
+    return {"algorithm": algorithm, "seed": seed, "state": node.state, "step": node.step, "score": node.state.score,
+            "time": time.perf_counter() - start, "stopped": stopped}
+
+
+def portfolio(problem, algorithms=tuple(ALGORITHMS), restarts=10, limit=100, workers=None, seed=0, time_limit=None):
+    """
+    Runs `restarts` independent restarts of each local search of `algorithms` on the graph of `problem`, spread over a pool
+    of `workers` processes (one per core by default), each restart being limited to `limit` steps and `time_limit` seconds.
+    Every restart has its own seed (seed, seed + 1, ...); the first restart of each algorithm starts from the greedy cover
+    and the others from a random greedy cover drawn from their seed. The graph is sent once to each worker. The workers
+    share the best score found so far and all of them stop once a cover of every edge is known.
+    Returns the best LSNode found and the list of the per-restart results (see run_restart).
+    """
+    initial = problem.initial
+    graph = (initial.k, initial.vertices, initial.edges, problem.evaluator is not None)
+    tasks = [(algorithm, "greedy" if i == 0 else "random_greedy") for algorithm in algorithms for i in range(restarts)]
+    best_score = multiprocessing.Value('i', 0)
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(best_score, graph)) as executor:
+        futures = [executor.submit(run_restart, algorithm, seed + i, limit, time_limit, init)
+                   for i, (algorithm, init) in enumerate(tasks)]
+        results = [future.result() for future in futures]
+    best = max(results, key=lambda r: r["score"])
+    return LSNode(problem, best["state"], best["step"]), results
+
+
 #####################
 #       Launch      #
 #####################
 if __name__ == '__main__':
     for file in os.listdir("instances"):
-        info = read_instance("instances/" + file)
-        init_state = State(k=info[0], vertices=info[1], edges=info[2])
+        k, graph = read_graph("instances/" + file)
+        init_state = State(k=k, vertices=graph.vertices, edges=graph.edges)
         vc_problem = VertexCover(init_state)
         step_limit = 100
         start = time.perf_counter()
-        for _ in range(10):
-            node = random_walk(vc_problem, step_limit)
-            used_covers.clear()
+        node, results = portfolio(vc_problem, restarts=10, limit=step_limit)
         end = time.perf_counter()
-        nstep = node.step
-        score = node.state.score
+        algorithm = max(results, key=lambda r: r["score"])["algorithm"]
         with open("result.txt", "a") as f:
-            f.write(f"{random_walk.__name__} with {file}:\tT={(end-start)/10:.2e}\tS={nstep}\tV={score}\n")
-        used_covers.clear()
+            f.write(f"portfolio ({algorithm}) with {file}:\tT={end-start:.2e}\tS={node.step}\tV={node.state.score}\n")
     # info = read_instance(sys.argv[1])
     # init_state = State(info[0], info[1], info[2])
     # vc_problem = VertexCover(init_state)